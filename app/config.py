@@ -1,7 +1,17 @@
 import os
+from typing import Literal
+
 from pydantic import BaseModel
 
 
+# Total-count strategies of GET /health-mentions (see list_mentions)
+MentionCountMode = Literal["exact", "planned", "estimated", "none"]
+# How the scraper enriches health items (see LLM_ENRICHMENT_MODE)
+EnrichmentMode = Literal["separate", "fused"]
+# Which scraped items get LLM summaries (see SUMMARY_POLICY)
+SummaryPolicy = Literal["llm", "extractive", "tiered"]
+
+
 class Settings(BaseModel):
     supabase_url: str
     supabase_service_role_key: str
@@ -14,7 +24,7 @@ class Settings(BaseModel):
         "https://www.malaymail.com/feed/rss/malaysia",
         "https://www.malaysiakini.com/rss/en/news.rss",
         "https://bernama.com/en/rssfeed.php",
-        "https://www.lowyat.net/feed/"
+        "https://www.lowyat.net/feed/",
         "https://news.google.com/rss?hl=en-MY&gl=MY&ceid=MY:en",
         "https://news.google.com/rss?hl=ms-MY&gl=MY&ceid=MY:ms",
         "https://news.google.com/rss/search?q=Malaysia&hl=en-MY&gl=MY&ceid=MY:en",
@@ -54,6 +64,22 @@ class Settings(BaseModel):
         "https://thesun.my/rss/images",
         "https://thesun.my/rss/education"
     ]
+    # Feed registry: rss_feeds above only seeds the `feeds` table; polling adapts per feed
+    feed_base_interval_minutes: int = 30
+    feed_min_interval_minutes: int = 10
+    feed_max_interval_minutes: int = 1440
+    feed_scheduler_tick_minutes: int = 5
+    # Concurrent feed fetching
+    rss_fetch_concurrency: int = 8
+    rss_fetch_timeout_seconds: float = 20.0
+    rss_per_host_concurrency: int = 2
+    # Streaming XML parser for RSS/Atom; falls back to feedparser per feed
+    rss_fast_parser: bool = True
+    # Conditional GET: per-feed ETag/Last-Modified/body hash persisted between runs
+    rss_conditional_get: bool = True
+    rss_cache_path: str = ".cache/rss_validators.json"
+    # In-memory index of stored links, re-warmed from the DB after this many minutes
+    seen_links_max_age_minutes: int = 360
     # Malaysia location dictionary (basic) for extraction
     malaysia_states: list[str] = [
         "Johor", "Kedah", "Kelantan", "Melaka", "Negeri Sembilan", "Pahang",
@@ -66,6 +92,67 @@ class Settings(BaseModel):
     openrouter_base_url: str = "https://openrouter.ai/api/v1"
     openrouter_model: str = "openai/gpt-4o-mini"
     enable_llm_location: bool = True
+    # Batch LLM calls: items per request and concurrent requests per batch call
+    llm_batch_size: int = 20
+    llm_batch_concurrency: int = 4
+    # Tune the batch size per task from measured latency and output size (starting at
+    # llm_batch_size, at most llm_batch_max_size); chunks always fit the model limits
+    llm_adaptive_batching: bool = True
+    llm_batch_max_size: int = 50
+    llm_context_tokens: int = 128_000
+    llm_max_output_tokens: int = 4096
+    # "separate": classify, summarize and locate with separate calls; "fused": one enrich_batch
+    # call. An unknown value fails validation
+    llm_enrichment_mode: EnrichmentMode = "separate"
+    # Stream batch responses and parse JSON arrays element by element; a cut-off
+    # array re-requests only the missing items, at most this many times
+    llm_streaming: bool = True
+    llm_stream_tail_retries: int = 2
+    # Prompt token budgets: per item in batch prompts, and for cleanup's article text
+    llm_item_token_budget: int = 300
+    llm_cleanup_token_budget: int = 2000
+    # "llm", "extractive" (local only) or "tiered" (LLM for high-priority items only);
+    # an unknown value fails validation
+    summary_policy: SummaryPolicy = "llm"
+    # Shared LLM client: in-flight requests, provider rate limits (<= 0 disables) and retries
+    llm_max_concurrency: int = 8
+    llm_requests_per_minute: int = 120
+    llm_tokens_per_minute: int = 200_000
+    llm_max_retries: int = 4
+    # Per-priority-class in-flight limits within llm_max_concurrency (0 = no class limit)
+    llm_interactive_concurrency: int = 0
+    llm_ingest_concurrency: int = 6
+    llm_background_concurrency: int = 4
+    llm_timeout_seconds: float = 60.0
+    # Call policy: overall deadline per call, hedging/failover to a fallback model
+    # (optionally on another OpenAI-compatible provider)
+    llm_call_deadline_seconds: float = 90.0
+    llm_fallback_model: str | None = None
+    llm_fallback_base_url: str | None = None
+    llm_fallback_api_key: str | None = None
+    # The fallback provider's own rate limits (default: the primary's)
+    llm_fallback_requests_per_minute: int = 120
+    llm_fallback_tokens_per_minute: int = 200_000
+    llm_hedge_percentile: float = 95.0
+    llm_hedge_min_delay_seconds: float = 2.0
+    llm_failover_error_rate: float = 0.5
+    llm_failover_cooldown_seconds: int = 120
+    # Local health pre-classifier: confident items skip the LLM classifier
+    preclassifier_enabled: bool = True
+    preclassifier_model_path: str = ".cache/preclassifier.json"
+    preclassifier_examples_path: str = ".cache/preclassifier_examples.jsonl"
+    preclassifier_accept_threshold: float = 0.9
+    preclassifier_reject_threshold: float = 0.1
+    # Mention statuses that mark a stored item as not health-related when training
+    preclassifier_negative_statuses: list[str] = ["false_positive", "irrelevant", "rejected", "dismissed"]
+    # Persistent per-item cache of LLM results (SQLite)
+    llm_cache_enabled: bool = True
+    llm_cache_path: str = ".cache/llm_cache.sqlite3"
+    llm_cache_ttl_seconds: int = 7 * 24 * 3600
+    llm_cache_max_entries: int = 200_000
+
+    # Default total-count strategy of GET /health-mentions; an unknown value fails validation
+    mentions_count_mode: MentionCountMode = "estimated"
 
     # Exa Search
     exa_api_key: str | None = None
@@ -137,8 +224,68 @@ def get_settings() -> Settings:
         openrouter_base_url=os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"),
         openrouter_model=os.getenv("OPENROUTER_MODEL", "openai/gpt-4o-mini"),
         enable_llm_location=os.getenv("ENABLE_LLM_LOCATION", "true").lower() in {"1", "true", "yes"},
+        llm_batch_size=int(os.getenv("LLM_BATCH_SIZE", "20")),
+        llm_batch_concurrency=int(os.getenv("LLM_BATCH_CONCURRENCY", "4")),
+        llm_adaptive_batching=os.getenv("LLM_ADAPTIVE_BATCHING", "true").lower() in {"1", "true", "yes"},
+        llm_batch_max_size=int(os.getenv("LLM_BATCH_MAX_SIZE", "50")),
+        llm_context_tokens=int(os.getenv("LLM_CONTEXT_TOKENS", "128000")),
+        llm_max_output_tokens=int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "4096")),
+        llm_enrichment_mode=os.getenv("LLM_ENRICHMENT_MODE", "separate").lower(),
+        llm_streaming=os.getenv("LLM_STREAMING", "true").lower() in {"1", "true", "yes"},
+        llm_stream_tail_retries=int(os.getenv("LLM_STREAM_TAIL_RETRIES", "2")),
+        llm_item_token_budget=int(os.getenv("LLM_ITEM_TOKEN_BUDGET", "300")),
+        llm_cleanup_token_budget=int(os.getenv("LLM_CLEANUP_TOKEN_BUDGET", "2000")),
+        summary_policy=os.getenv("SUMMARY_POLICY", "llm").lower(),
+        llm_max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+        llm_requests_per_minute=int(os.getenv("LLM_REQUESTS_PER_MINUTE", "120")),
+        llm_tokens_per_minute=int(os.getenv("LLM_TOKENS_PER_MINUTE", "200000")),
+        llm_max_retries=int(os.getenv("LLM_MAX_RETRIES", "4")),
+        llm_interactive_concurrency=int(os.getenv("LLM_INTERACTIVE_CONCURRENCY", "0")),
+        llm_ingest_concurrency=int(os.getenv("LLM_INGEST_CONCURRENCY", "6")),
+        llm_background_concurrency=int(os.getenv("LLM_BACKGROUND_CONCURRENCY", "4")),
+        llm_timeout_seconds=float(os.getenv("LLM_TIMEOUT_SECONDS", "60")),
+        llm_call_deadline_seconds=float(os.getenv("LLM_CALL_DEADLINE_SECONDS", "90")),
+        llm_fallback_model=os.getenv("LLM_FALLBACK_MODEL") or None,
+        llm_fallback_base_url=os.getenv("LLM_FALLBACK_BASE_URL") or None,
+        llm_fallback_api_key=os.getenv("LLM_FALLBACK_API_KEY") or None,
+        llm_fallback_requests_per_minute=int(
+            os.getenv("LLM_FALLBACK_REQUESTS_PER_MINUTE", os.getenv("LLM_REQUESTS_PER_MINUTE", "120"))
+        ),
+        llm_fallback_tokens_per_minute=int(
+            os.getenv("LLM_FALLBACK_TOKENS_PER_MINUTE", os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+        ),
+        llm_hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "95")),
+        llm_hedge_min_delay_seconds=float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "2")),
+        llm_failover_error_rate=float(os.getenv("LLM_FAILOVER_ERROR_RATE", "0.5")),
+        llm_failover_cooldown_seconds=int(os.getenv("LLM_FAILOVER_COOLDOWN_SECONDS", "120")),
+        preclassifier_enabled=os.getenv("PRECLASSIFIER_ENABLED", "true").lower() in {"1", "true", "yes"},
+        preclassifier_model_path=os.getenv("PRECLASSIFIER_MODEL_PATH", ".cache/preclassifier.json"),
+        preclassifier_examples_path=os.getenv("PRECLASSIFIER_EXAMPLES_PATH", ".cache/preclassifier_examples.jsonl"),
+        preclassifier_accept_threshold=float(os.getenv("PRECLASSIFIER_ACCEPT_THRESHOLD", "0.9")),
+        preclassifier_reject_threshold=float(os.getenv("PRECLASSIFIER_REJECT_THRESHOLD", "0.1")),
+        preclassifier_negative_statuses=[
+            s.strip().lower()
+            for s in os.getenv("PRECLASSIFIER_NEGATIVE_STATUSES", "false_positive,irrelevant,rejected,dismissed").split(",")
+            if s.strip()
+        ],
+        llm_cache_enabled=os.getenv("LLM_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"},
+        llm_cache_path=os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite3"),
+        llm_cache_ttl_seconds=int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+        llm_cache_max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "200000")),
         exa_api_key=os.getenv("EXA_API_KEY"),
         exa_recent_days=int(os.getenv("EXA_RECENT_DAYS", "7")),
+        feed_base_interval_minutes=int(os.getenv("FEED_BASE_INTERVAL_MINUTES", "30")),
+        feed_min_interval_minutes=int(os.getenv("FEED_MIN_INTERVAL_MINUTES", "10")),
+        feed_max_interval_minutes=int(os.getenv("FEED_MAX_INTERVAL_MINUTES", "1440")),
+        feed_scheduler_tick_minutes=int(os.getenv("FEED_SCHEDULER_TICK_MINUTES", "5")),
+        rss_fetch_concurrency=int(os.getenv("RSS_FETCH_CONCURRENCY", "8")),
+        rss_fetch_timeout_seconds=float(os.getenv("RSS_FETCH_TIMEOUT_SECONDS", "20")),
+        rss_per_host_concurrency=int(os.getenv("RSS_PER_HOST_CONCURRENCY", "2")),
+        rss_fast_parser=os.getenv("RSS_FAST_PARSER", "true").lower() in {"1", "true", "yes"},
+        rss_conditional_get=os.getenv("RSS_CONDITIONAL_GET", "true").lower() in {"1", "true", "yes"},
+        rss_cache_path=os.getenv("RSS_CACHE_PATH", ".cache/rss_validators.json"),
+        seen_links_max_age_minutes=int(os.getenv("SEEN_LINKS_MAX_AGE_MINUTES", "360")),
+        mentions_count_mode=os.getenv("MENTIONS_COUNT_MODE", "estimated").lower(),
     )
 
 
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from typing import Iterable, Optional, Set
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class SeenLinkIndex:
+    """In-memory set of links already stored in `mentions`.
+
+    Warmed from the DB on first use and re-warmed after `max_age_seconds`; inserts
+    made through this process are added as they happen. A failed warm leaves the
+    index empty, which only means nothing gets skipped.
+    """
+
+    def __init__(self, max_age_seconds: float = 6 * 3600) -> None:
+        self.max_age_seconds = max_age_seconds
+        self._links: Set[str] = set()
+        self._lock = threading.Lock()
+        self._warmed_at: Optional[float] = None
+
+    def ensure_warm(self) -> None:
+        with self._lock:
+            fresh = (
+                self._warmed_at is not None
+                and time.monotonic() - self._warmed_at < self.max_age_seconds
+            )
+        if not fresh:
+            self.warm()
+
+    def warm(self) -> None:
+        from app.db.supabase_client import iter_mention_links  # lazy import to avoid cycle
+
+        try:
+            links = set(iter_mention_links())
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Failed to warm seen-link index: %s", exc)
+            return
+        with self._lock:
+            self._links |= links
+            self._warmed_at = time.monotonic()
+        logger.info("Seen-link index warmed with %d links", len(links))
+
+    def __contains__(self, link: object) -> bool:
+        if not link:
+            return False
+        with self._lock:
+            return link in self._links
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._links)
+
+    def add(self, link: Optional[str]) -> None:
+        if link:
+            with self._lock:
+                self._links.add(link)
+
+    def add_many(self, links: Iterable[Optional[str]]) -> None:
+        with self._lock:
+            self._links.update(link for link in links if link)
+
+
+_index: Optional[SeenLinkIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_seen_link_index() -> SeenLinkIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            from app.config import get_settings
+
+            _index = SeenLinkIndex(get_settings().seen_links_max_age_minutes * 60)
+        return _index
@@ -1,13 +1,23 @@
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple, get_args
+import base64
+import json
 import logging
+import re
 from supabase import create_client, Client
 
-from app.config import get_settings
+from app.config import MentionCountMode, get_settings
+from app.db.seen_links import get_seen_link_index
 
 
 logger = logging.getLogger(__name__)
 
 _supabase_client: Optional[Client] = None
+# Rows per bulk upsert request
+_UPSERT_CHUNK = 500
+# Total-count strategies accepted by list_mentions
+MENTION_COUNT_MODES = get_args(MentionCountMode)
+_CURSOR_DATE = re.compile(r"\d{4}-\d{2}-\d{2}([T ][0-9:.]+(Z|[+-]\d{2}:?\d{2})?)?")
+_CURSOR_ID = re.compile(r"[0-9A-Za-z-]{1,64}")
 
 
 def get_client() -> Client:
@@ -23,8 +33,8 @@ def get_client() -> Client:
     return _supabase_client
 
 
-def upsert_mention(data: Dict[str, Any]) -> Dict[str, Any]:
-    """Insert into mentions if no existing row with the same link. Return the row."""
+def _insert_if_new(data: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    """(row, inserted): the existing row with the same link, or the newly inserted one."""
     client = get_client()
     link = data.get("link")
     if link:
@@ -32,26 +42,119 @@ def upsert_mention(data: Dict[str, Any]) -> Dict[str, Any]:
             client.table("mentions").select("*").eq("link", link).limit(1).execute()
         )
         if existing.data:
-            return existing.data[0]
+            get_seen_link_index().add(link)
+            return existing.data[0], False
     resp = client.table("mentions").insert(data).execute()
     if not resp.data:
         raise RuntimeError("Insert failed")
-    return resp.data[0]
+    get_seen_link_index().add(link)
+    return resp.data[0], True
 
 
-def list_mentions(
+def upsert_mention(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Insert into mentions if no existing row with the same link. Return the row."""
+    return _insert_if_new(data)[0]
+
+
+def bulk_upsert_mentions(records: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Insert many mentions with one request per `_UPSERT_CHUNK` rows, skipping links
+    that are already stored (ON CONFLICT (link) DO NOTHING via the unique index on
+    mentions.link, see database/schema.sql).
+
+    Returns {"inserted": stored rows, "existing": records whose link was already stored
+    or repeated earlier in `records`, "failed": records that could not be written}.
+    A chunk the bulk request fails for (e.g. the index is missing) is retried row by row.
+    """
+    result: Dict[str, List[Dict[str, Any]]] = {"inserted": [], "existing": [], "failed": []}
+    batch: List[Dict[str, Any]] = []
+    links = set()
+    for record in records:
+        link = record.get("link")
+        if link and link in links:
+            result["existing"].append(record)
+            continue
+        links.add(link)
+        batch.append(record)
+    if not batch:
+        return result
+    client = get_client()
+    seen_index = get_seen_link_index()
+    for start in range(0, len(batch), _UPSERT_CHUNK):
+        chunk = batch[start : start + _UPSERT_CHUNK]
+        try:
+            resp = (
+                client.table("mentions")
+                .upsert(chunk, on_conflict="link", ignore_duplicates=True, default_to_null=False)
+                .execute()
+            )
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Bulk upsert of %d mentions failed, inserting one by one: %s", len(chunk), exc)
+            for record in chunk:
+                try:
+                    row, inserted = _insert_if_new(record)
+                except Exception as row_exc:  # noqa: BLE001
+                    logger.warning("Failed to upsert %s: %s", record.get("link"), row_exc)
+                    result["failed"].append(record)
+                    continue
+                result["inserted" if inserted else "existing"].append(row if inserted else record)
+            continue
+        rows = resp.data or []
+        stored = {row.get("link") for row in rows}
+        result["inserted"].extend(rows)
+        result["existing"].extend(record for record in chunk if record.get("link") not in stored)
+        seen_index.add_many(record.get("link") for record in chunk)
+    return result
+
+
+def iter_mention_links(page_size: int = 1000) -> Iterator[str]:
+    """Yield every stored mention link, paging through the table."""
+    client = get_client()
+    start = 0
+    while True:
+        resp = (
+            client.table("mentions")
+            .select("link")
+            .order("id")
+            .range(start, start + page_size - 1)
+            .execute()
+        )
+        rows = resp.data or []
+        for row in rows:
+            if row.get("link"):
+                yield row["link"]
+        if len(rows) < page_size:
+            return
+        start += page_size
+
+
+def iter_labeled_mentions(page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """Yield headline, summary and status of every stored mention (pre-classifier training)."""
+    client = get_client()
+    start = 0
+    while True:
+        resp = (
+            client.table("mentions")
+            .select("headline,summary,status")
+            .order("id")
+            .range(start, start + page_size - 1)
+            .execute()
+        )
+        rows = resp.data or []
+        yield from rows
+        if len(rows) < page_size:
+            return
+        start += page_size
+
+
+def _apply_mention_filters(
+    query: Any,
     *,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     data_source: Optional[str] = None,
     status: Optional[str] = None,
     keywords: Optional[List[str]] = None,
-    page: int = 1,
-    page_size: int = 20,
-) -> Tuple[List[Dict[str, Any]], int]:
-    client = get_client()
-    query = client.table("mentions").select("*")
-
+) -> Any:
     if start_date:
         query = query.gte("date", start_date)
     if end_date:
@@ -63,31 +166,82 @@ def list_mentions(
     if keywords:
         # Array overlap - PostgREST uses 'ov' for overlap
         query = query.overlaps("keywords", keywords)
+    return query
 
-    range_from = (page - 1) * page_size
-    range_to = range_from + page_size - 1
-    query = query.range(range_from, range_to)
 
-    resp = query.execute()
-    if resp.data is None:
-        return [], 0
+def encode_mention_cursor(row: Dict[str, Any]) -> str:
+    """Opaque cursor pointing just after `row` in (date desc, id desc) order."""
+    raw = json.dumps([str(row.get("date")), str(row.get("id"))], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
 
-    # Get total count with a separate call due to range applied
-    count_query = client.table("mentions").select("id", count="exact")
-    if start_date:
-        count_query = count_query.gte("date", start_date)
-    if end_date:
-        count_query = count_query.lte("date", end_date)
-    if data_source:
-        count_query = count_query.eq("data_source", data_source)
-    if status:
-        count_query = count_query.eq("status", status)
-    if keywords:
-        count_query = count_query.overlaps("keywords", keywords)
-    count_resp = count_query.execute()
-    total = count_resp.count or 0
 
-    return resp.data, total
+def decode_mention_cursor(cursor: str) -> Tuple[str, str]:
+    """(date, id) of a cursor from encode_mention_cursor; ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        date_value, id_value = json.loads(raw)
+    except Exception as exc:  # noqa: BLE001
+        raise ValueError("invalid cursor") from exc
+    # Both values end up inside a PostgREST filter string: allow only plain tokens
+    if not isinstance(date_value, str) or not _CURSOR_DATE.fullmatch(date_value):
+        raise ValueError("invalid cursor")
+    if not isinstance(id_value, str) or not _CURSOR_ID.fullmatch(id_value):
+        raise ValueError("invalid cursor")
+    return date_value, id_value
+
+
+def list_mentions(
+    *,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    data_source: Optional[str] = None,
+    status: Optional[str] = None,
+    keywords: Optional[List[str]] = None,
+    page: int = 1,
+    page_size: int = 20,
+    count: str = "estimated",
+    cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[int], Optional[str]]:
+    """One page of mentions, newest first (date desc, id desc), with the total matching
+    rows and the cursor of the next page (None on the last page), in a single request.
+
+    With `cursor` (a previous page's next_cursor) the page is fetched by keyset, so its
+    cost does not grow with depth and rows inserted meanwhile do not shift it; `page`
+    is then ignored and the total counts only the rows after the cursor. Without it,
+    `page` selects an OFFSET page as before.
+
+    `count` is one of MENTION_COUNT_MODES: PostgREST's "exact" (COUNT(*), slow on a
+    large table), "planned" (the planner's row estimate), "estimated" (exact up to the
+    API's max-rows, planned above it) or "none", for which the total is None.
+    """
+    if count not in MENTION_COUNT_MODES:
+        raise ValueError(f"count must be one of {', '.join(MENTION_COUNT_MODES)}")
+    client = get_client()
+    query = client.table("mentions").select("*", count=None if count == "none" else count)
+    query = _apply_mention_filters(
+        query,
+        start_date=start_date,
+        end_date=end_date,
+        data_source=data_source,
+        status=status,
+        keywords=keywords,
+    )
+    query = query.order("date", desc=True).order("id", desc=True)
+
+    # One extra row tells whether there is a next page
+    if cursor:
+        date_value, id_value = decode_mention_cursor(cursor)
+        query = query.or_(f"date.lt.{date_value},and(date.eq.{date_value},id.lt.{id_value})")
+        query = query.limit(page_size + 1)
+    else:
+        range_from = (page - 1) * page_size
+        query = query.range(range_from, range_from + page_size)
+    resp = query.execute()
+    rows = resp.data or []
+    items = rows[:page_size]
+    next_cursor = encode_mention_cursor(items[-1]) if len(rows) > page_size else None
+    total = None if count == "none" else (resp.count or 0)
+    return items, total, next_cursor
 
 
 def update_mention_status(mention_id: str, status: str) -> Dict[str, Any]:
@@ -142,3 +296,39 @@ def delete_keyword(keyword_id: str) -> Dict[str, Any]:
     return resp.data[0] if resp.data else {"id": keyword_id, "deleted": True}
 
 
+
+
+def list_feeds(enabled_only: bool = False) -> List[Dict[str, Any]]:
+    client = get_client()
+    query = client.table("feeds").select("*")
+    if enabled_only:
+        query = query.eq("enabled", True)
+    resp = query.order("url").execute()
+    return resp.data or []
+
+
+def add_feeds(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Insert feeds, skipping URLs already registered. Returns the inserted rows."""
+    if not entries:
+        return []
+    client = get_client()
+    resp = (
+        client.table("feeds")
+        .upsert(entries, on_conflict="url", ignore_duplicates=True)
+        .execute()
+    )
+    return resp.data or []
+
+
+def update_feed(feed_id: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+    client = get_client()
+    resp = client.table("feeds").update(fields).eq("id", feed_id).execute()
+    if not resp.data:
+        raise RuntimeError("Feed not found or update failed")
+    return resp.data[0]
+
+
+def delete_feed(feed_id: str) -> Dict[str, Any]:
+    client = get_client()
+    resp = client.table("feeds").delete().eq("id", feed_id).execute()
+    return resp.data[0] if resp.data else {"id": feed_id, "deleted": True}
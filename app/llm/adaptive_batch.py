@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
+import logging
+import threading
+
+from app.config import get_settings
+from app.llm.prompt_builder import estimate_tokens
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Starting guess of completion tokens per item until calls have been measured
+_OUTPUT_TOKENS_PER_ITEM = {"classifier": 3, "summarizer": 45, "enrichment": 70, "location": 20}
+_DEFAULT_OUTPUT_TOKENS_PER_ITEM = 50
+# JSON punctuation and keys around each item in the prompt payload
+_ITEM_OVERHEAD_TOKENS = 12
+# Fraction of the output limit a chunk may be planned to use
+_OUTPUT_HEADROOM = 0.8
+# Full-size calls measured before the batch size is moved again
+_SAMPLES_PER_STEP = 3
+_GROWTH = 1.25
+_EWMA_ALPHA = 0.3
+
+
+def _ewma(previous: Optional[float], value: float) -> float:
+    return value if previous is None else previous + _EWMA_ALPHA * (value - previous)
+
+
+class AdaptiveBatcher:
+    """Batch size for one LLM task, tuned from measured calls.
+
+    The size hill-climbs on throughput (items per second of a full-size call): after
+    a few calls at one size it moves by `_GROWTH` in the direction that last helped
+    and turns around when throughput drops. A missed deadline halves the size; an
+    answer cut off at the output limit caps it at the number of items that fit, and the
+    cap grows back toward `llm_batch_max_size` by `_GROWTH` every few successful calls.
+    Short or malformed answers count as failures and do not move the size. Each chunk is further cut
+    so its estimated prompt plus completion fits `llm_context_tokens` and its
+    estimated completion fits `llm_max_output_tokens`.
+    """
+
+    def __init__(self, task: str) -> None:
+        settings = get_settings()
+        self.task = task
+        self.size = float(max(1, settings.llm_batch_size))
+        self.max_size = max(1, settings.llm_batch_max_size)
+        self.ceiling = self.max_size
+        self.output_per_item = float(_OUTPUT_TOKENS_PER_ITEM.get(task, _DEFAULT_OUTPUT_TOKENS_PER_ITEM))
+        self._direction = 1
+        self._throughput: Optional[float] = None
+        self._previous_throughput: Optional[float] = None
+        self._samples = 0
+        self._successes_since_cut = 0
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "items": 0, "truncated": 0, "failed": 0, "token_capped_chunks": 0}
+        self.last_decision = "initial"
+
+    def _target(self) -> int:
+        return max(1, min(self.ceiling, int(round(self.size))))
+
+    def target(self) -> int:
+        with self._lock:
+            return self._target()
+
+    def split(
+        self,
+        items: Sequence[T],
+        system_prompt: str,
+        item_text: Callable[[T], str],
+        size: Optional[int] = None,
+    ) -> List[Sequence[T]]:
+        """Consecutive chunks of `items`, each at most `size` (default: the tuned
+        target) and within the context and output token limits.
+        """
+        settings = get_settings()
+        with self._lock:
+            target = size or self._target()
+            output_per_item = self.output_per_item
+        item_budget = settings.llm_item_token_budget
+        output_limit = settings.llm_max_output_tokens * _OUTPUT_HEADROOM
+        chunks: List[Sequence[T]] = []
+        start = 0
+        prompt = estimate_tokens(system_prompt)
+        capped = 0
+        for i, item in enumerate(items):
+            # prepare_item cuts each item's text to the per-item budget
+            cost = min(item_budget, estimate_tokens(item_text(item))) + _ITEM_OVERHEAD_TOKENS
+            count = i - start
+            output = (count + 1) * output_per_item
+            over_tokens = prompt + cost + output > settings.llm_context_tokens or output > output_limit
+            if count and (count >= target or over_tokens):
+                capped += 1 if count < target else 0
+                chunks.append(items[start:i])
+                start = i
+                prompt = estimate_tokens(system_prompt)
+            prompt += cost
+        if start < len(items):
+            chunks.append(items[start:])
+        if capped:
+            with self._lock:
+                self._stats["token_capped_chunks"] += capped
+        return chunks
+
+    def observe(
+        self,
+        requested: int,
+        returned: int,
+        completion_tokens: int,
+        latency: float,
+        *,
+        failed: bool = False,
+        timed_out: bool = False,
+        cut_off: bool = False,
+    ) -> None:
+        """Feed back one call: `requested` items sent, `returned` results parsed.
+        `cut_off` means the answer ended inside the array (output limit reached);
+        `failed` covers errors and short, malformed or non-array answers.
+        """
+        with self._lock:
+            stats = self._stats
+            stats["calls"] += 1
+            stats["items"] += returned
+            if returned:
+                self.output_per_item = _ewma(self.output_per_item, completion_tokens / returned)
+            current = self._target()
+            if requested > 1 and (timed_out or (cut_off and returned < requested)):
+                stats["truncated"] += 1
+                if timed_out:
+                    # Too slow for the deadline: back off, but a slow provider may recover
+                    self.size = max(1.0, min(self.size, requested) / 2)
+                else:
+                    # Cut off at the output limit: no more than the items that fit
+                    self.ceiling = max(1, min(self.ceiling, returned or requested // 2))
+                    self.size = min(self.size, float(self.ceiling))
+                    self._successes_since_cut = 0
+                self._reset_probe(-1)
+                self.last_decision = f"shrink to {self._target()} after a cut-off {requested}-item call"
+                logger.info("LLM %s batch size: %s", self.task, self.last_decision)
+                return
+            if failed or cut_off or returned < requested:
+                stats["failed"] += 1
+                return
+            self._raise_ceiling()
+            if requested != current or latency <= 0:
+                # Tail retries and remainder chunks do not say much about the target size
+                return
+            self._throughput = _ewma(self._throughput, returned / latency)
+            self._samples += 1
+            if self._samples < _SAMPLES_PER_STEP:
+                return
+            if self._previous_throughput is not None and self._throughput < self._previous_throughput:
+                self._direction = -self._direction
+            self._previous_throughput = self._throughput
+            factor = _GROWTH if self._direction > 0 else 1 / _GROWTH
+            new_size = max(1.0, min(float(self.ceiling), self.size * factor))
+            if int(round(new_size)) == current:
+                # Step too small to change the integer size: move by one item
+                new_size = max(1.0, min(float(self.ceiling), current + self._direction))
+            self.size = new_size
+            self._throughput = None
+            self._samples = 0
+            verb = "grow" if self._direction > 0 else "shrink"
+            self.last_decision = f"{verb} to {self._target()} at {self._previous_throughput:.1f} items/s"
+
+    def _raise_ceiling(self) -> None:
+        # A cut-off cap decays back toward max_size; another cut-off lowers it again
+        if self.ceiling >= self.max_size:
+            return
+        self._successes_since_cut += 1
+        if self._successes_since_cut >= _SAMPLES_PER_STEP:
+            self.ceiling = min(self.max_size, max(self.ceiling + 1, int(self.ceiling * _GROWTH)))
+            self._successes_since_cut = 0
+
+    def _reset_probe(self, direction: int) -> None:
+        self._direction = direction
+        self._throughput = None
+        self._previous_throughput = None
+        self._samples = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "batch_size": self._target(),
+                "ceiling": self.ceiling,
+                "output_tokens_per_item": round(self.output_per_item, 1),
+                "last_decision": self.last_decision,
+            }
+
+
+_batchers: Dict[str, AdaptiveBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(task: str) -> AdaptiveBatcher:
+    with _batchers_lock:
+        batcher = _batchers.get(task)
+        if batcher is None:
+            batcher = _batchers[task] = AdaptiveBatcher(task)
+        return batcher
+
+
+def _item_text(item: Any) -> str:
+    return " ".join(str(item.get(key) or "") for key in ("title", "summary", "text"))
+
+
+def plan_chunks(
+    task: str,
+    items: Sequence[T],
+    system_prompt: str,
+    item_text: Callable[[T], str] = _item_text,
+) -> List[Sequence[T]]:
+    """Chunks for one batch call of `task`: the tuned size when `llm_adaptive_batching`
+    is on, else `llm_batch_size`; either way within the token limits.
+    """
+    settings = get_settings()
+    size = None if settings.llm_adaptive_batching else max(1, settings.llm_batch_size)
+    return get_batcher(task).split(items, system_prompt, item_text, size)
+
+
+def observe_call(task: str, requested: int, returned: int, completion_tokens: int, latency: float, **flags: bool) -> None:
+    if get_settings().llm_adaptive_batching:
+        get_batcher(task).observe(requested, returned, completion_tokens, latency, **flags)
+
+
+def batching_metrics() -> Dict[str, Any]:
+    with _batchers_lock:
+        batchers = dict(_batchers)
+    return {task: batcher.snapshot() for task, batcher in batchers.items()}
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Sequence, Set, TypeVar
+import contextvars
+import logging
+import threading
+
+from app.llm.call_policy import track_answers
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class FallbackCount:
+    """Items that batch calls in one context got no result for (see track_fallbacks)."""
+
+    def __init__(self) -> None:
+        self.items = 0
+        self._lock = threading.Lock()
+
+    def add(self, items: int) -> None:
+        with self._lock:
+            self.items += items
+
+
+_fallbacks: contextvars.ContextVar[Optional[FallbackCount]] = contextvars.ContextVar("llm_fallbacks", default=None)
+
+
+@contextmanager
+def track_fallbacks() -> Iterator[FallbackCount]:
+    """Count the items run_chunked calls in this context (and in threads started with a
+    copy of it) return None for, i.e. items whose callers fall back to defaults.
+    """
+    count = FallbackCount()
+    token = _fallbacks.set(count)
+    try:
+        yield count
+    finally:
+        _fallbacks.reset(token)
+
+
+_item_answers: contextvars.ContextVar[Optional[List[Set[str]]]] = contextvars.ContextVar("llm_item_answers", default=None)
+
+
+@contextmanager
+def track_item_answers(size: int) -> Iterator[List[Set[str]]]:
+    """Models that answered each item of the `size` items passed to the run_chunked
+    call made in this context (an empty set where no call answered).
+    """
+    answers: List[Set[str]] = [set() for _ in range(size)]
+    token = _item_answers.set(answers)
+    try:
+        yield answers
+    finally:
+        _item_answers.reset(token)
+
+
+def chunked(items: Sequence[T], size: int) -> List[Sequence[T]]:
+    size = max(1, size)
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def run_chunked(
+    items: Sequence[T],
+    worker: Callable[[Sequence[T]], Optional[List[R]]],
+    *,
+    max_workers: int,
+    chunk_size: int = 0,
+    planner: Optional[Callable[[Sequence[T]], List[Sequence[T]]]] = None,
+) -> List[Optional[R]]:
+    """Split `items` into chunks of at most `chunk_size` (or the consecutive chunks
+    `planner` returns), run `worker` on them concurrently and reassemble the results in
+    input order.
+
+    A chunk whose worker raises, returns None or returns too few results yields None
+    for its (missing) positions, so callers can apply per-item defaults to the failed
+    chunk only.
+    """
+    if not items:
+        return []
+    chunks = planner(items) if planner is not None else chunked(items, chunk_size)
+    answers = _item_answers.get()
+    if answers is not None and len(answers) != len(items):
+        answers = None
+    offsets = [sum(len(chunk) for chunk in chunks[:i]) for i in range(len(chunks))]
+
+    def _run(chunk: Sequence[T], offset: int) -> List[Optional[R]]:
+        with track_answers() as models:
+            try:
+                results = worker(chunk)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("LLM chunk of %d items failed: %s", len(chunk), exc)
+                results = None
+        if answers is not None:
+            answers[offset : offset + len(chunk)] = [models] * len(chunk)
+        results = list(results or [])[: len(chunk)]
+        results += [None] * (len(chunk) - len(results))
+        count = _fallbacks.get()
+        if count is not None:
+            count.add(results.count(None))
+        return results
+
+    if len(chunks) == 1:
+        return _run(chunks[0], 0)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks))), thread_name_prefix="llm-batch") as pool:
+        # Workers inherit the caller's context, so its llm_priority class applies to every chunk
+        futures = [
+            pool.submit(contextvars.copy_context().run, _run, chunk, offset) for chunk, offset in zip(chunks, offsets)
+        ]
+        per_chunk = [future.result() for future in futures]
+    return [result for chunk_results in per_chunk for result in chunk_results]
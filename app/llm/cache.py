@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from app.config import get_settings
+from app.llm.batching import track_item_answers
+from app.llm.call_policy import track_answers
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Returned by LLMCache.get_many for keys without a live entry (None is a valid cached value)
+MISS = object()
+
+# Run size-based eviction every this many writes
+_EVICT_EVERY = 200
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(unicodedata.normalize("NFKC", value).split())
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def cache_key(task: str, model: str, version: str, content: Any) -> str:
+    """Hash of task, model, prompt version and whitespace/Unicode-normalized content."""
+    body = json.dumps(_normalize(content), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(f"{task}\x1f{model}\x1f{version}\x1f{body}".encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """SQLite-backed store of per-item LLM results with TTL and LRU size eviction."""
+
+    def __init__(self, path: str, ttl_seconds: int, max_entries: int) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._writes_since_evict = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, task TEXT NOT NULL, value TEXT NOT NULL,"
+            " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+        self._conn.commit()
+
+    def get_many(self, keys: Sequence[str]) -> List[Any]:
+        """Cached values for `keys` in order, MISS where absent or expired."""
+        if not keys:
+            return []
+        now = time.time()
+        found: Dict[str, Any] = {}
+        with self._lock:
+            unique = list(dict.fromkeys(keys))
+            for start in range(0, len(unique), 500):
+                batch = unique[start : start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, value, created_at FROM llm_cache WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                for key, value, created_at in rows:
+                    if now - created_at <= self.ttl_seconds:
+                        found[key] = json.loads(value)
+            if found:
+                self._conn.executemany(
+                    "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", [(now, k) for k in found]
+                )
+                self._conn.commit()
+            hits = sum(1 for k in keys if k in found)
+            self._stats["hits"] += hits
+            self._stats["misses"] += len(keys) - hits
+        return [found.get(k, MISS) for k in keys]
+
+    def get(self, key: str) -> Any:
+        return self.get_many([key])[0]
+
+    def set_many(self, task: str, entries: Sequence[Tuple[str, Any]]) -> None:
+        if not entries:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO llm_cache (key, task, value, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [(k, task, json.dumps(v, ensure_ascii=False), now, now) for k, v in entries],
+            )
+            self._conn.commit()
+            self._stats["writes"] += len(entries)
+            self._writes_since_evict += len(entries)
+            if self._writes_since_evict >= _EVICT_EVERY:
+                self._evict(now)
+
+    def set(self, task: str, key: str, value: Any) -> None:
+        self.set_many(task, [(key, value)])
+
+    def _evict(self, now: float) -> None:
+        self._writes_since_evict = 0
+        expired = self._conn.execute(
+            "DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            # Trim to 90% of capacity, least recently used first
+            overflow += self.max_entries // 10
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN"
+                " (SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                (overflow,),
+            )
+        self._conn.commit()
+        self._stats["evictions"] += max(expired, 0) + max(overflow, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["entries"] = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else None
+        return stats
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """The process-wide cache, or None when disabled or the store cannot be opened."""
+    global _cache
+    settings = get_settings()
+    if not settings.llm_cache_enabled:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = LLMCache(
+                    settings.llm_cache_path,
+                    ttl_seconds=settings.llm_cache_ttl_seconds,
+                    max_entries=settings.llm_cache_max_entries,
+                )
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("LLM cache unavailable at %s: %s", settings.llm_cache_path, exc)
+                return None
+        return _cache
+
+
+def cached_batch(
+    task: str,
+    version: str,
+    model: str,
+    items: Sequence[T],
+    key_content: Callable[[T], Any],
+    compute: Callable[[List[T]], List[Optional[R]]],
+) -> List[Optional[R]]:
+    """Per-item memoization for batched LLM calls: only uncached items are passed to
+    `compute`; its non-None results are stored unless another model than `model`
+    (the fallback) answered them, since they are keyed on `model`. Returns results in
+    input order, None where `compute` failed.
+    """
+    cache = get_llm_cache()
+    if cache is None:
+        return compute(list(items))
+    keys = [cache_key(task, model, version, key_content(item)) for item in items]
+    try:
+        results = cache.get_many(keys)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Failed to read LLM cache: %s", exc)
+        results = [MISS] * len(keys)
+    missing = [i for i, value in enumerate(results) if value is MISS]
+    if missing:
+        with track_item_answers(len(missing)) as answers:
+            fresh = compute([items[i] for i in missing])
+        to_store = []
+        for i, value, models in zip(missing, fresh, answers):
+            results[i] = value
+            if value is not None and models <= {model}:
+                to_store.append((keys[i], value))
+        try:
+            cache.set_many(task, to_store)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Failed to write LLM cache: %s", exc)
+    return [None if value is MISS else value for value in results]
+
+
+def cached_call(task: str, version: str, model: str, content: Any, compute: Callable[[], Optional[R]]) -> Optional[R]:
+    """Memoize a single LLM call; a None result means failure and is not stored, and
+    neither is an answer from another model than `model` (the fallback).
+    """
+    cache = get_llm_cache()
+    if cache is None:
+        return compute()
+    key = cache_key(task, model, version, content)
+    try:
+        cached = cache.get(key)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Failed to read LLM cache: %s", exc)
+        cached = MISS
+    if cached is not MISS:
+        return cached
+    with track_answers() as models:
+        value = compute()
+    if value is not None and models <= {model}:
+        try:
+            cache.set(task, key, value)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Failed to write LLM cache: %s", exc)
+    return value
@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Set, Tuple
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+
+from app.config import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+# Recent calls kept per model for latency percentiles / error rates
+_LATENCY_WINDOW = 500
+_OUTCOME_WINDOW = 20
+# Samples needed before a model's percentile is trusted for hedging
+_MIN_LATENCY_SAMPLES = 20
+_MIN_OUTCOME_SAMPLES = 10
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+class ModelStats:
+    """Rolling latency and error-rate statistics per model, plus failover state."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._first_tokens: Dict[str, Deque[float]] = {}
+        self._outcomes: Dict[str, Deque[bool]] = {}
+        self._totals: Dict[str, Dict[str, int]] = {}
+        self._failover_until: Dict[str, float] = {}
+        self._hedges = {"launched": 0, "won": 0}
+
+    def record(self, model: str, latency: Optional[float], ok: bool, rejected: bool = False) -> None:
+        """One provider request: `latency` of the request itself, and whether the
+        provider `rejected` it (a non-retryable 4xx, which says nothing about its health
+        and is kept out of the failover error rate).
+        """
+        with self._lock:
+            totals = self._totals.setdefault(model, {"calls": 0, "errors": 0, "rejected": 0})
+            totals["calls"] += 1
+            totals["errors"] += 0 if ok else 1
+            totals["rejected"] += 1 if rejected else 0
+            if not rejected:
+                self._outcomes.setdefault(model, deque(maxlen=_OUTCOME_WINDOW)).append(ok)
+            if ok and latency is not None:
+                self._latencies.setdefault(model, deque(maxlen=_LATENCY_WINDOW)).append(latency)
+
+    def record_first_token(self, model: str, latency: float) -> None:
+        with self._lock:
+            self._first_tokens.setdefault(model, deque(maxlen=_LATENCY_WINDOW)).append(latency)
+
+    def count_hedge(self, outcome: str) -> None:
+        with self._lock:
+            self._hedges[outcome] += 1
+
+    def percentile(self, model: str, pct: float, first_token: bool = False) -> Optional[float]:
+        """Latency percentile of `model`'s requests, or of their time to the first
+        streamed token; None until enough samples are in.
+        """
+        with self._lock:
+            values = list((self._first_tokens if first_token else self._latencies).get(model, ()))
+        if len(values) < _MIN_LATENCY_SAMPLES:
+            return None
+        return _percentile(values, pct)
+
+    def error_rate(self, model: str) -> Optional[float]:
+        with self._lock:
+            outcomes = list(self._outcomes.get(model, ()))
+        if len(outcomes) < _MIN_OUTCOME_SAMPLES:
+            return None
+        return 1 - sum(outcomes) / len(outcomes)
+
+    def failing_over(self, model: str, threshold: float, cooldown: float) -> bool:
+        """Whether calls for `model` should go to the fallback: true for `cooldown`
+        seconds after its recent error rate reaches `threshold`.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._failover_until.get(model, 0) > now:
+                return True
+        rate = self.error_rate(model)
+        if rate is not None and rate >= threshold:
+            with self._lock:
+                self._failover_until[model] = now + cooldown
+                # Start the next evaluation from a clean window
+                self._outcomes.pop(model, None)
+            logger.warning("LLM model %s error rate %.0f%%, failing over for %ds", model, rate * 100, cooldown)
+            return True
+        return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            models = {}
+            for model, totals in self._totals.items():
+                latencies = list(self._latencies.get(model, ()))
+                first_tokens = list(self._first_tokens.get(model, ()))
+                outcomes = list(self._outcomes.get(model, ()))
+                models[model] = {
+                    **totals,
+                    "recent_error_rate": round(1 - sum(outcomes) / len(outcomes), 4) if outcomes else None,
+                    "p50_ms": _ms(_percentile(latencies, 50)),
+                    "p95_ms": _ms(_percentile(latencies, 95)),
+                    "p99_ms": _ms(_percentile(latencies, 99)),
+                    "first_token_p95_ms": _ms(_percentile(first_tokens, 95)),
+                    "failover_active": self._failover_until.get(model, 0) > now,
+                }
+            return {"models": models, "hedges": dict(self._hedges)}
+
+
+def _ms(seconds: Optional[float]) -> Optional[int]:
+    return int(seconds * 1000) if seconds is not None else None
+
+
+_stats = ModelStats()
+
+# Models that answered the calls made in one context (see track_answers)
+_answered: contextvars.ContextVar[Optional[Set[str]]] = contextvars.ContextVar("llm_answered", default=None)
+
+
+@contextmanager
+def track_answers() -> Iterator[Set[str]]:
+    """Collect the models that answered `execute` / `open_stream` calls made in this
+    context, including calls handed to the client loop from it, so callers can tell a
+    fallback answer from a primary one.
+    """
+    models: Set[str] = set()
+    token = _answered.set(models)
+    try:
+        yield models
+    finally:
+        _answered.reset(token)
+
+
+def _note_answer(model: str) -> None:
+    models = _answered.get()
+    if models is not None:
+        models.add(model)
+
+
+async def execute(client: Any, messages: List[Dict[str, str]], **kwargs: Any) -> Optional[str]:
+    """Run one completion under the call policy:
+
+    - the whole call (retries and hedges included) must finish within
+      `llm_call_deadline_seconds`, else asyncio.TimeoutError is raised
+    - when the primary model is slower than its `llm_hedge_percentile` latency, a
+      hedged request goes to `llm_fallback_model` and the first answer wins
+    - a primary error fails over to the fallback at once, and while the primary's
+      recent error rate is at least `llm_failover_error_rate` all calls go to the
+      fallback for `llm_failover_cooldown_seconds`
+
+    `client` is the LLMClient whose `acomplete(..., provider=...)` sends one request
+    and records each provider request's latency and outcome (see record_call), so
+    queueing, rate-limit waits and retry backoff do not count as model latency.
+    """
+    settings = get_settings()
+    primary = kwargs.pop("model", None) or settings.openrouter_model
+    fallback = settings.llm_fallback_model
+    if fallback == primary:
+        fallback = None
+    first, second = primary, fallback
+    if fallback and _stats.failing_over(primary, settings.llm_failover_error_rate, settings.llm_failover_cooldown_seconds):
+        first, second = fallback, None
+    try:
+        return await asyncio.wait_for(
+            _hedged(client, messages, first, second, primary, kwargs), timeout=settings.llm_call_deadline_seconds
+        )
+    except asyncio.TimeoutError:
+        logger.warning("LLM call to %s missed its %.0fs deadline", first, settings.llm_call_deadline_seconds)
+        raise
+
+
+async def _hedged(
+    client: Any,
+    messages: List[Dict[str, str]],
+    first: str,
+    second: Optional[str],
+    primary: str,
+    kwargs: Dict[str, Any],
+) -> Optional[str]:
+    settings = get_settings()
+
+    models: Dict[asyncio.Task, str] = {}
+
+    def _call(model: str) -> asyncio.Task:
+        provider = "primary" if model == primary else "fallback"
+        task = asyncio.ensure_future(client.acomplete(messages, model=model, provider=provider, **kwargs))
+        models[task] = model
+        return task
+
+    tasks: Set[asyncio.Task] = {_call(first)}
+    hedge: Optional[asyncio.Task] = None
+    hedge_delay = None
+    if second:
+        p = _stats.percentile(first, settings.llm_hedge_percentile)
+        hedge_delay = max(settings.llm_hedge_min_delay_seconds, p) if p is not None else None
+    pending: Set[asyncio.Task] = set(tasks)
+    last_exc: Optional[BaseException] = None
+    try:
+        if hedge_delay is not None:
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+            if not done:
+                hedge = _call(second)
+                tasks.add(hedge)
+                pending.add(hedge)
+                second = None
+                _stats.count_hedge("launched")
+            else:
+                pending = done
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        _stats.count_hedge("won")
+                    _note_answer(models[task])
+                    return task.result()
+                last_exc = task.exception()
+            if not pending and second:
+                # The primary failed outright: fail over without waiting for a hedge
+                logger.info("LLM model %s failed (%s), failing over to %s", first, last_exc, second)
+                failover = _call(second)
+                tasks.add(failover)
+                pending = {failover}
+                second = None
+        raise last_exc  # type: ignore[misc]
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def open_stream(
+    client: Any, messages: List[Dict[str, str]], **kwargs: Any
+) -> Tuple[AsyncIterator[str], Optional[str], str]:
+    """Open a streamed completion under the call policy, hedged on time to first token.
+
+    Like `execute`, the stream goes to the fallback while the primary is failed over,
+    and a primary that fails before its first token fails over at once. When the
+    primary's first token takes longer than its `llm_hedge_percentile` time to first
+    token (at least `llm_hedge_min_delay_seconds`), a hedged stream goes to the fallback
+    and whichever produces a token first is kept; the other is closed.
+
+    Returns (deltas, first delta or None for an empty answer, model) of the kept
+    stream; the caller reads the rest from `deltas` and must close it.
+    """
+    settings = get_settings()
+    primary = kwargs.pop("model", None) or settings.openrouter_model
+    fallback = settings.llm_fallback_model
+    if fallback == primary:
+        fallback = None
+    first, second = primary, fallback
+    if fallback and _stats.failing_over(primary, settings.llm_failover_error_rate, settings.llm_failover_cooldown_seconds):
+        first, second = fallback, None
+    hedge_delay = None
+    if second:
+        p = _stats.percentile(first, settings.llm_hedge_percentile, first_token=True)
+        hedge_delay = max(settings.llm_hedge_min_delay_seconds, p) if p is not None else None
+
+    streams: Dict[asyncio.Task, Tuple[AsyncIterator[str], str]] = {}
+
+    async def _first_delta(deltas: AsyncIterator[str]) -> Optional[str]:
+        try:
+            return await deltas.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    def _open(model: str) -> asyncio.Task:
+        provider = "primary" if model == primary else "fallback"
+        deltas = client.astream(messages, model=model, provider=provider, **kwargs)
+        task = asyncio.ensure_future(_first_delta(deltas))
+        streams[task] = (deltas, model)
+        return task
+
+    pending: Set[asyncio.Task] = {_open(first)}
+    hedge: Optional[asyncio.Task] = None
+    winner: Optional[asyncio.Task] = None
+    last_exc: Optional[BaseException] = None
+    try:
+        if hedge_delay is not None:
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+            if not done:
+                hedge = _open(second)
+                pending.add(hedge)
+                second = None
+                _stats.count_hedge("launched")
+            else:
+                pending = done
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        _stats.count_hedge("won")
+                    winner = task
+                    deltas, model = streams[task]
+                    _note_answer(model)
+                    return deltas, task.result(), model
+                last_exc = task.exception()
+            if not pending and second:
+                # The primary failed before its first token: fail over without waiting for a hedge
+                logger.info("LLM stream from %s failed (%s), failing over to %s", first, last_exc, second)
+                pending = {_open(second)}
+                second = None
+        raise last_exc  # type: ignore[misc]
+    finally:
+        # Close the losing (or every failed) stream and free its slot
+        for task, (deltas, _) in streams.items():
+            if task is winner:
+                continue
+            if not task.done():
+                task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await deltas.aclose()
+
+
+def record_call(model: str, latency: Optional[float], ok: bool, rejected: bool = False) -> None:
+    """Feed one provider request (timed around the request only) into the stats."""
+    _stats.record(model, latency, ok, rejected)
+
+
+def record_first_token(model: str, latency: float) -> None:
+    """Time from sending a streamed request to its first content delta."""
+    _stats.record_first_token(model, latency)
+
+
+def call_policy_metrics() -> Dict[str, Any]:
+    return _stats.snapshot()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence
+import json
+
+from app.config import get_settings
+from app.llm.adaptive_batch import plan_chunks
+from app.llm.batching import run_chunked
+from app.llm.cache import cached_batch
+from app.llm.json_stream import complete_json_array
+from app.llm.openrouter_client import get_llm_client
+from app.llm.prompt_builder import prepare_item
+from app.llm.preclassifier import gate
+from app.location.locations import normalize_location
+
+
+PROMPT_VERSION = "v1"
+
+SYSTEM_PROMPT = """
+You enrich Malaysian news items for public health monitoring. For each object in the JSON array of {title, text}, return one object with keys:
+- is_health: true if the item is HEALTH-RELATED in Malaysia or relevant to Malaysian public health, else false.
+- summary: ONE neutral, factual sentence (<= 30 words) summarizing the main health-related point ("" when is_health is false).
+- state: official Malaysian state or federal territory the item most likely refers to, or null.
+- district: official district within that state, or null.
+Respond ONLY with a JSON array of these objects, same length and order as the input.
+"""
+
+
+def _default_enrichment() -> Dict:
+    # Same defaults as the separate calls: keep the item (recall), no summary, no location
+    return {"is_health": True, "summary": "", "location": None}
+
+
+def _coerce(entry: object) -> Optional[Dict]:
+    if not isinstance(entry, dict):
+        return None
+    flag = entry.get("is_health")
+    if isinstance(flag, str):
+        flag = flag.lower() in {"true", "yes", "y"}
+    summary = entry.get("summary")
+    state, district = normalize_location(entry.get("state"), entry.get("district"))
+    location: Optional[Dict[str, str]] = None
+    if state or district:
+        location = {k: v for k, v in (("state", state), ("district", district)) if v}
+    return {
+        "is_health": True if flag is None else bool(flag),
+        "summary": str(summary) if summary is not None else "",
+        "location": location,
+    }
+
+
+def _enrich_messages(chunk: Sequence[dict]) -> List[Dict[str, str]]:
+    budget = get_settings().llm_item_token_budget
+    prepared = [prepare_item("enrichment", it.get("title") or "", it.get("text") or "", budget) for it in chunk]
+    payload = json.dumps([{"title": title, "text": text} for title, text in prepared])
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": payload},
+    ]
+
+
+def _enrich_chunk(client, model: str, chunk: List[dict]) -> List[Optional[Dict]]:
+    return complete_json_array(
+        client, chunk, _enrich_messages, _coerce, task="enrichment", model=model, temperature=0.1
+    )
+
+
+def enrich_batch(items: List[dict]) -> List[Dict]:
+    """Health flag, one-sentence summary and location for each item in one structured
+    call per chunk, replacing classify_batch + summarize_batch + extract_location_with_llm.
+    Each item: {"title": str, "text": str}
+    Returns [{"is_health": bool, "summary": str, "location": {"state", "district"} | None}]
+    in input order; locations are validated with normalize_location. Results are
+    cached per item, and items the local pre-classifier confidently rejects are not sent.
+    """
+    settings = get_settings()
+    flags = gate([it.get("text") or it.get("title") or "" for it in items])
+    results: List[Optional[Dict]] = [
+        {"is_health": False, "summary": "", "location": None} if flag is False else None for flag in flags
+    ]
+    pending = [i for i, flag in enumerate(flags) if flag is not False]
+    if not pending:
+        return results
+    try:
+        client = get_llm_client()
+    except Exception:
+        for i in pending:
+            results[i] = _default_enrichment()
+        return results
+
+    fresh = cached_batch(
+        "enrichment",
+        PROMPT_VERSION,
+        settings.openrouter_model,
+        [items[i] for i in pending],
+        lambda it: {"title": it.get("title") or "", "text": it.get("text") or ""},
+        lambda misses: run_chunked(
+            misses,
+            lambda chunk: _enrich_chunk(client, settings.openrouter_model, list(chunk)),
+            planner=lambda misses: plan_chunks("enrichment", misses, SYSTEM_PROMPT),
+            max_workers=settings.llm_batch_concurrency,
+        ),
+    )
+    for i, result in zip(pending, fresh):
+        results[i] = result or _default_enrichment()
+    return results
@@ -1,26 +1,30 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Sequence
 import json
+import threading
 
 from app.config import get_settings
-from app.llm.openrouter_client import get_openrouter_client
+from app.llm.adaptive_batch import plan_chunks
+from app.llm.batching import run_chunked
+from app.llm.cache import cached_batch, cached_call
+from app.llm.json_stream import complete_json_array
+from app.llm.openrouter_client import get_llm_client, strip_code_fence
+from app.llm.prompt_builder import prepare_item
+from app.llm.preclassifier import gate, record_examples
 
 
+# Bump when a prompt changes so cached results from the old prompt are not reused
+PROMPT_VERSION = "v1"
+
 SYSTEM_PROMPT = """
 You are a strict binary classifier. Given a news item's title and summary, decide if it is HEALTH-RELATED (public health, diseases, outbreaks, vaccines, hospitals, environment affecting health, etc.) in Malaysia or generally relevant to Malaysian public health.
 Respond with STRICT JSON: {"is_health": true|false} and nothing else.
 """
 
 
-def is_health_related(title: str, summary: str) -> Optional[bool]:
-    settings = get_settings()
-    try:
-        client = get_openrouter_client()
-    except Exception:
-        # If no LLM configured, default to True to avoid missing items
-        return True
-
+def _classify_one(client, model: str, title: str, summary: str) -> Optional[bool]:
+    title, summary = prepare_item("classifier", title, summary, get_settings().llm_item_token_budget)
     user_prompt = (
         f"Title: {title or ''}\n\n"
         f"Summary: {summary or ''}\n\n"
@@ -28,27 +32,17 @@ def is_health_related(title: str, summary: str) -> Optional[bool]:
     )
 
     try:
-        completion = client.chat.completions.create(
-            model=settings.openrouter_model,
-            messages=[
+        content = client.complete(
+            [
                 {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": user_prompt},
             ],
+            model=model,
             temperature=0.0,
         )
-        if not completion or not getattr(completion, "choices", None):
-            return None
-        first = completion.choices[0]
-        message = getattr(first, "message", None)
-        content = getattr(message, "content", None)
         if not content:
             return None
-        raw = content.strip()
-        if raw.startswith("```"):
-            raw = raw.strip("` ")
-            if raw.startswith("json"):
-                raw = raw[4:].strip()
-        data = json.loads(raw)
+        data = json.loads(strip_code_fence(content))
         val = data.get("is_health") if isinstance(data, dict) else None
         if isinstance(val, bool):
             return val
@@ -60,57 +54,113 @@ def is_health_related(title: str, summary: str) -> Optional[bool]:
         return None
 
 
-def classify_batch(items: list[dict]) -> list[bool]:
-    """Classify up to ~20 items per request to reduce costs.
-    Items: [{"title": str, "summary": str}]
-    Returns a list of booleans (default True on failure for recall).
-    """
+def is_health_related(title: str, summary: str) -> Optional[bool]:
     settings = get_settings()
     try:
-        client = get_openrouter_client()
+        client = get_llm_client()
     except Exception:
-        return [True] * len(items)
+        # If no LLM configured, default to True to avoid missing items
+        return True
 
-    # Build a compact JSON array to send once
-    payload = json.dumps(
-        [
-            {"title": (it.get("title") or ""), "summary": (it.get("summary") or "")}
-            for it in items
-        ]
+    return cached_call(
+        "health_single",
+        PROMPT_VERSION,
+        settings.openrouter_model,
+        {"title": title or "", "summary": summary or ""},
+        lambda: _classify_one(client, settings.openrouter_model, title, summary),
     )
 
-    system = (
-        "You are a strict binary classifier. For each entry in the provided JSON array of {title, summary},"
-        " decide if it is HEALTH-RELATED in Malaysia or relevant to Malaysian public health."
-        " Respond ONLY with a JSON array of booleans, same order as input (e.g., [true,false,...])."
+
+BATCH_SYSTEM_PROMPT = (
+    "You are a strict binary classifier. For each entry in the provided JSON array of {title, summary},"
+    " decide if it is HEALTH-RELATED in Malaysia or relevant to Malaysian public health."
+    " Respond ONLY with a JSON array of booleans, same order as input (e.g., [true,false,...])."
+)
+
+
+def _classify_messages(chunk: Sequence[dict]) -> List[Dict[str, str]]:
+    # Build a compact JSON array to send once
+    budget = get_settings().llm_item_token_budget
+    prepared = [prepare_item("classifier", it.get("title") or "", it.get("summary") or "", budget) for it in chunk]
+    payload = json.dumps([{"title": title, "summary": summary} for title, summary in prepared])
+    return [
+        {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": payload},
+    ]
+
+
+def _classify_chunk(
+    client, model: str, chunk: list[dict], on_result: Optional[Callable[[dict, Optional[bool]], None]] = None
+) -> list[Optional[bool]]:
+    return complete_json_array(
+        client, chunk, _classify_messages, bool, on_result=on_result, task="classifier", model=model, temperature=0.0
     )
 
+
+def _gate_text(item: dict) -> str:
+    return " ".join([item.get("title") or "", item.get("summary") or ""])
+
+
+def classify_batch(items: list[dict], on_result: Optional[Callable[[dict, bool], None]] = None) -> list[bool]:
+    """Classify items in adaptively sized chunks (see adaptive_batch), running up to
+    `llm_batch_concurrency` requests at once.
+    Items: [{"title": str, "summary": str}]
+    Items the local pre-classifier is confident about skip the LLM, and LLM results
+    are cached per item, so only uncertain, uncached items are sent.
+    `on_result(item, flag)` is called once per item as soon as its flag is known
+    (streamed LLM answers arrive element by element), possibly from batch worker threads.
+    Returns a list of booleans in input order (default True for a failed chunk, for recall).
+    """
+    settings = get_settings()
+    reported: set[int] = set()
+    reported_lock = threading.Lock()
+
+    def _report(item: dict, flag: Optional[bool]) -> None:
+        if on_result is None or flag is None:
+            return
+        # Chunk threads report concurrently: claim the item before calling back
+        with reported_lock:
+            if id(item) in reported:
+                return
+            reported.add(id(item))
+        on_result(item, flag)
+
+    def _finish(flags: list[Optional[bool]]) -> list[bool]:
+        final = [True if flag is None else flag for flag in flags]
+        for item, flag in zip(items, final):
+            _report(item, flag)
+        return final
+
+    flags = gate([_gate_text(it) for it in items])
+    for item, flag in zip(items, flags):
+        _report(item, flag)
+    pending = [i for i, flag in enumerate(flags) if flag is None]
+    if not pending:
+        return _finish(flags)
     try:
-        completion = client.chat.completions.create(
-            model=settings.openrouter_model,
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": payload},
-            ],
-            temperature=0.0,
-        )
-        if not completion or not getattr(completion, "choices", None):
-            return [True] * len(items)
-        first = completion.choices[0]
-        message = getattr(first, "message", None)
-        content = getattr(message, "content", None)
-        if not content:
-            return [True] * len(items)
-        raw = content.strip()
-        if raw.startswith("```"):
-            raw = raw.strip("` ")
-            if raw.startswith("json"):
-                raw = raw[4:].strip()
-        data = json.loads(raw)
-        if isinstance(data, list):
-            return [bool(x) for x in data][: len(items)]
-        return [True] * len(items)
+        client = get_llm_client()
     except Exception:
-        return [True] * len(items)
+        return _finish(flags)
 
+    def _classify_uncached(misses: list[dict]) -> list[Optional[bool]]:
+        results = run_chunked(
+            misses,
+            lambda chunk: _classify_chunk(client, settings.openrouter_model, list(chunk), _report),
+            planner=lambda misses: plan_chunks("classifier", misses, BATCH_SYSTEM_PROMPT),
+            max_workers=settings.llm_batch_concurrency,
+        )
+        # LLM decisions become training data for the pre-classifier
+        record_examples([_gate_text(it) for it in misses], results)
+        return results
 
+    results = cached_batch(
+        "health_batch",
+        PROMPT_VERSION,
+        settings.openrouter_model,
+        [items[i] for i in pending],
+        lambda it: {"title": it.get("title") or "", "summary": it.get("summary") or ""},
+        _classify_uncached,
+    )
+    for i, flag in zip(pending, results):
+        flags[i] = flag
+    return _finish(flags)
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+import asyncio
+import json
+import logging
+import time
+
+from app.config import get_settings
+from app.llm.adaptive_batch import observe_call
+from app.llm.prompt_builder import CHARS_PER_TOKEN
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class JSONArrayParser:
+    """Incremental parser for one top-level JSON array arriving in pieces.
+
+    `feed` returns the elements completed by each piece, so callers can act on the
+    first results while the rest is still being generated. Text before the opening
+    "[" (e.g. a ```json fence) is ignored; a malformed element raises ValueError.
+    """
+
+    def __init__(self) -> None:
+        self.started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._element: List[str] = []
+        self.closed = False
+
+    def feed(self, text: str) -> List[Any]:
+        elements: List[Any] = []
+        for ch in text:
+            if self.closed:
+                break
+            if not self.started:
+                self.started = ch == "["
+                continue
+            if self._in_string:
+                self._element.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch in "[{":
+                self._depth += 1
+            elif ch in "]}":
+                if self._depth == 0:
+                    # End of the top-level array
+                    self._flush(elements)
+                    self.closed = True
+                    continue
+                self._depth -= 1
+            elif ch == "," and self._depth == 0:
+                self._flush(elements)
+                continue
+            self._element.append(ch)
+        return elements
+
+    def _flush(self, elements: List[Any]) -> None:
+        raw = "".join(self._element).strip()
+        self._element = []
+        if raw:
+            elements.append(json.loads(raw))
+
+
+def _stream_elements(
+    client: Any,
+    messages: List[Dict[str, str]],
+    on_element: Callable[[int, Any], None],
+    **kwargs: Any,
+) -> Tuple[int, int, Optional[Exception], bool]:
+    """Parse the completion's JSON array, calling `on_element` per element as it
+    completes. Returns how many elements were parsed before the end, a cut-off or an
+    error (the caller retries the rest), the characters received, the error if any and
+    whether the answer ended inside the array (cut off at the output limit).
+    """
+    settings = get_settings()
+    parser = JSONArrayParser()
+    count = 0
+    chars = 0
+    error: Optional[Exception] = None
+    pieces: Iterable[str] = ()
+    try:
+        pieces = client.stream(messages, **kwargs) if settings.llm_streaming else [client.complete(messages, **kwargs) or ""]
+        for piece in pieces:
+            chars += len(piece)
+            for element in parser.feed(piece):
+                on_element(count, element)
+                count += 1
+            if parser.closed:
+                break
+    except Exception as exc:  # noqa: BLE001
+        error = exc
+        logger.warning("LLM JSON array cut off after %d elements: %s", count, exc or type(exc).__name__)
+    finally:
+        # Stop a stream that is still open (e.g. text after the array) and free its slot
+        close = getattr(pieces, "close", None)
+        if close is not None:
+            close()
+    cut_off = error is None and parser.started and not parser.closed
+    return count, chars, error, cut_off
+
+
+def complete_json_array(
+    client: Any,
+    chunk: Sequence[T],
+    build_messages: Callable[[Sequence[T]], List[Dict[str, str]]],
+    coerce: Callable[[Any], Optional[R]],
+    *,
+    on_result: Optional[Callable[[T, Optional[R]], None]] = None,
+    task: Optional[str] = None,
+    **kwargs: Any,
+) -> List[Optional[R]]:
+    """One JSON-array completion for `chunk` (one element per item, in order).
+
+    Elements are coerced and handed to `on_result(item, result)` as soon as they are
+    parsed. If the array is truncated or malformed, only the items after the last
+    good element are sent again, up to `llm_stream_tail_retries` times; a call that
+    fails before its first element is not retried. Each request
+    is measured for `task`'s adaptive batch size. Returns the results obtained,
+    possibly fewer than `chunk` (run_chunked pads with None).
+    """
+    settings = get_settings()
+    results: List[Optional[R]] = []
+    retries = 0
+    while len(results) < len(chunk):
+        remaining = chunk[len(results):]
+        offset = len(results)
+
+        def _accept(index: int, element: Any) -> None:
+            if index >= len(remaining):
+                return
+            result = coerce(element)
+            results.append(result)
+            if on_result is not None:
+                on_result(chunk[offset + index], result)
+
+        started = time.monotonic()
+        count, chars, error, cut_off = _stream_elements(client, build_messages(remaining), _accept, **kwargs)
+        if task is not None:
+            returned = min(count, len(remaining))
+            observe_call(
+                task,
+                len(remaining),
+                returned,
+                chars // CHARS_PER_TOKEN,
+                time.monotonic() - started,
+                # Errors and short, malformed or non-array answers say nothing about the size
+                failed=not cut_off and (error is not None or returned < len(remaining)),
+                timed_out=isinstance(error, asyncio.TimeoutError),
+                cut_off=cut_off,
+            )
+        if len(results) >= len(chunk) or retries >= settings.llm_stream_tail_retries:
+            break
+        if count == 0 and error is not None and not isinstance(error, ValueError):
+            # Transport error or missed deadline before any element: not a cut-off tail
+            break
+        retries += 1
+        logger.info("Retrying the last %d of %d items of an LLM batch", len(chunk) - len(results), len(chunk))
+    return results
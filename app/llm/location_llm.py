@@ -1,13 +1,21 @@
 from __future__ import annotations
 
 import json
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Sequence
 
 from app.config import get_settings
-from app.llm.openrouter_client import get_openrouter_client
+from app.llm.adaptive_batch import plan_chunks
+from app.llm.batching import run_chunked
+from app.llm.cache import cached_batch, cached_call
+from app.llm.json_stream import complete_json_array
+from app.llm.openrouter_client import get_llm_client
+from app.llm.prompt_builder import prepare_item
 from app.location.locations import normalize_location
+from app.scrapers.location_extractor import extract_location
 
 
+PROMPT_VERSION = "v1"
+
 SYSTEM_PROMPT = """
 You are a data extraction assistant. Given Malaysian news text, extract the precise state and district in Malaysia that the text most likely refers to.
 Respond in STRICT JSON with keys: state, district. Use official Malaysian state and district names. If unknown, use null.
@@ -20,6 +28,19 @@ def extract_location_with_llm(title: str, summary: str) -> Optional[Dict[str, st
     if not settings.enable_llm_location:
         return None
 
+    # "No location" is cached as {} so unresolvable articles are not re-queried
+    result = cached_call(
+        "location",
+        PROMPT_VERSION,
+        settings.openrouter_model,
+        {"title": title or "", "summary": summary or ""},
+        lambda: _extract_location(settings.openrouter_model, title, summary),
+    )
+    return result or None
+
+
+def _extract_location(model: str, title: str, summary: str) -> Optional[Dict[str, str]]:
+    title, summary = prepare_item("location", title, summary, get_settings().llm_item_token_budget)
     user_prompt = (
         f"Title: {title or ''}\n\n"
         f"Summary: {summary or ''}\n\n"
@@ -28,20 +49,15 @@ def extract_location_with_llm(title: str, summary: str) -> Optional[Dict[str, st
 
     # Defensive call with guards; return None on any failure
     try:
-        client = get_openrouter_client()
-        completion = client.chat.completions.create(
-            model=settings.openrouter_model,
-            messages=[
+        client = get_llm_client()
+        content = client.complete(
+            [
                 {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": user_prompt},
             ],
+            model=model,
             temperature=0.1,
         )
-        if not completion or not getattr(completion, "choices", None):
-            return None
-        first = completion.choices[0]
-        message = getattr(first, "message", None)
-        content = getattr(message, "content", None)
         if not content:
             return None
         content = content.strip()
@@ -57,17 +73,85 @@ def extract_location_with_llm(title: str, summary: str) -> Optional[Dict[str, st
     except Exception:
         return None
 
+    return _normalized(data)
+
+
+def _normalized(data) -> Dict[str, str]:
+    """Normalized {"state", "district"} from a model answer; {} when it names no known place."""
     state = data.get("state") if isinstance(data, dict) else None
     district = data.get("district") if isinstance(data, dict) else None
 
     norm_state, norm_district = normalize_location(state, district)
-    if norm_state or norm_district:
-        result: Dict[str, str] = {}
-        if norm_state:
-            result["state"] = norm_state
-        if norm_district:
-            result["district"] = norm_district
-        return result
-    return None
+    result: Dict[str, str] = {}
+    if norm_state:
+        result["state"] = norm_state
+    if norm_district:
+        result["district"] = norm_district
+    return result
+
+
+BATCH_SYSTEM_PROMPT = (
+    "You are a data extraction assistant. For each object in the JSON array of {title, text} from Malaysian news,"
+    " extract the precise Malaysian state and district the text most likely refers to, choosing the most specific"
+    " match when several are mentioned. Use official Malaysian state and district names, or null if unknown."
+    " Respond ONLY with a JSON array of {\"state\": ..., \"district\": ...} objects in the same order as the input."
+)
+
+
+def _locate_messages(chunk: Sequence[dict]) -> List[Dict[str, str]]:
+    budget = get_settings().llm_item_token_budget
+    prepared = [prepare_item("location", it.get("title") or "", it.get("text") or "", budget) for it in chunk]
+    payload = json.dumps([{"title": title, "text": text} for title, text in prepared])
+    return [
+        {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": payload},
+    ]
+
+
+def _locate_chunk(client, model: str, chunk: List[dict]) -> List[Optional[Dict[str, str]]]:
+    return complete_json_array(
+        client, chunk, _locate_messages, _normalized, task="location", model=model, temperature=0.1
+    )
+
+
+def extract_locations_with_llm(items: List[dict]) -> List[Optional[Dict[str, str]]]:
+    """Batch variant of extract_location_with_llm: one call per adaptively sized chunk of
+    items, cached per item. Each item: {"title": str, "text": str}
+    Returns normalized {"state", "district"} dicts in input order, None where unknown.
+    """
+    settings = get_settings()
+    if not settings.enable_llm_location or not items:
+        return [None] * len(items)
+    try:
+        client = get_llm_client()
+    except Exception:
+        return [None] * len(items)
+
+    results = cached_batch(
+        "location_batch",
+        PROMPT_VERSION,
+        settings.openrouter_model,
+        items,
+        lambda it: {"title": it.get("title") or "", "text": it.get("text") or ""},
+        lambda misses: run_chunked(
+            misses,
+            lambda chunk: _locate_chunk(client, settings.openrouter_model, list(chunk)),
+            planner=lambda misses: plan_chunks("location", misses, BATCH_SYSTEM_PROMPT),
+            max_workers=settings.llm_batch_concurrency,
+        ),
+    )
+    return [result or None for result in results]
+
+
+def resolve_locations(items: List[dict]) -> List[Optional[Dict[str, str]]]:
+    """Gazetteer first for every item; only the unresolved ones go to one batched LLM call.
+    Each item: {"title": str, "text": str}
+    """
+    locations = [extract_location(" ".join([it.get("title") or "", it.get("text") or ""])) for it in items]
+    unresolved = [i for i, location in enumerate(locations) if not location]
+    if unresolved:
+        for i, location in zip(unresolved, extract_locations_with_llm([items[i] for i in unresolved])):
+            locations[i] = location
+    return locations
 
 
@@ -1,22 +1,413 @@
-from typing import Optional
-from openai import OpenAI
+from __future__ import annotations
+
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+import asyncio
+import logging
+import queue
+import random
+import threading
+import time
+
+import httpx
+from openai import APIConnectionError, APIStatusError, APITimeoutError, AsyncOpenAI
 
 from app.config import get_settings
+from app.llm import call_policy
+from app.llm.priority import BACKGROUND, INGEST, INTERACTIVE, PriorityGate, current_priority
+
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio used to reserve token budget before a call
+_CHARS_PER_TOKEN = 4
+# End-of-stream marker passed from the loop thread to a streaming caller
+_STREAM_END = object()
+# Output tokens reserved per call when max_tokens is not given
+_DEFAULT_OUTPUT_RESERVE = 256
+_BACKOFF_BASE_SECONDS = 1.0
+_BACKOFF_MAX_SECONDS = 30.0
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at `rate_per_minute`, holding at most one
+    minute's worth. A non-positive rate disables the limit.
+    """
+
+    def __init__(self, rate_per_minute: float) -> None:
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(rate_per_minute)
+        self._tokens = self.capacity
+        self._updated: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        if self._updated is not None:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        if self.rate <= 0:
+            return
+        # Requests larger than the bucket would never fit; let them through at a full bucket
+        amount = min(amount, self.capacity)
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            while True:
+                self._refill(loop.time())
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+
+    def adjust(self, amount: float) -> None:
+        """Debit (positive) or refund (negative) tokens once the real cost is known."""
+        if self.rate <= 0:
+            return
+        self._tokens = min(self.capacity, self._tokens - amount)
+
 
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, (APITimeoutError, APIConnectionError)):
+        return True
+    if isinstance(exc, APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return False
 
-_client: Optional[OpenAI] = None
 
+def _is_rejected(exc: Exception) -> bool:
+    """A non-retryable 4xx: the request itself was refused (bad parameters, context too
+    long, auth), which says nothing about the provider's health.
+    """
+    return isinstance(exc, APIStatusError) and not _is_retryable(exc)
 
-def get_openrouter_client() -> OpenAI:
-    global _client
-    if _client is None:
+
+def _record_error(model: str, exc: Exception) -> None:
+    call_policy.record_call(model, None, ok=False, rejected=_is_rejected(exc))
+
+
+def _retry_delay(exc: Exception, attempt: int) -> float:
+    """Retry-After when the provider sends one, else exponential backoff with full jitter."""
+    response = getattr(exc, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(_BACKOFF_MAX_SECONDS, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+    return random.uniform(0, min(_BACKOFF_MAX_SECONDS, _BACKOFF_BASE_SECONDS * 2**attempt))
+
+
+def _estimate_tokens(messages: List[Dict[str, str]], max_tokens: Optional[int]) -> int:
+    chars = sum(len(m.get("content") or "") for m in messages)
+    return chars // _CHARS_PER_TOKEN + (max_tokens or _DEFAULT_OUTPUT_RESERVE)
+
+
+class LLMClient:
+    """Rate-limited chat-completion facade over one pooled `AsyncOpenAI` client.
+
+    All requests run on a private event loop thread, so synchronous callers (route
+    handlers, the scheduler, batch worker threads) share the connection pool, the
+    request/token buckets and the priority-aware concurrency limits. The primary and
+    the fallback provider each have their own pool, buckets and limits, so hedges and
+    failovers are not held up by a saturated primary.
+    """
+
+    def __init__(self) -> None:
         settings = get_settings()
         if not settings.openrouter_api_key:
             raise RuntimeError("OPENROUTER_API_KEY is not set")
-        _client = OpenAI(
-            api_key=settings.openrouter_api_key,
-            base_url=settings.openrouter_base_url,
-        )
-    return _client
+        self.default_model = settings.openrouter_model
+        self.max_retries = settings.llm_max_retries
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-client", daemon=True)
+        self._thread.start()
+
+        async def _setup() -> None:
+            limits = httpx.Limits(
+                max_connections=settings.llm_max_concurrency,
+                max_keepalive_connections=settings.llm_max_concurrency,
+            )
+            self._http = {
+                provider: httpx.AsyncClient(limits=limits, timeout=settings.llm_timeout_seconds)
+                for provider in ("primary", "fallback")
+            }
+            self._clients = {
+                "primary": AsyncOpenAI(
+                    api_key=settings.openrouter_api_key,
+                    base_url=settings.openrouter_base_url,
+                    http_client=self._http["primary"],
+                    max_retries=0,
+                ),
+                # The fallback model may live on another OpenAI-compatible provider
+                "fallback": AsyncOpenAI(
+                    api_key=settings.llm_fallback_api_key or settings.openrouter_api_key,
+                    base_url=settings.llm_fallback_base_url or settings.openrouter_base_url,
+                    http_client=self._http["fallback"],
+                    max_retries=0,
+                ),
+            }
+            class_limits = {
+                INTERACTIVE: settings.llm_interactive_concurrency,
+                INGEST: settings.llm_ingest_concurrency,
+                BACKGROUND: settings.llm_background_concurrency,
+            }
+            self._gates = {
+                provider: PriorityGate(settings.llm_max_concurrency, class_limits)
+                for provider in ("primary", "fallback")
+            }
+            self._requests = {
+                "primary": TokenBucket(settings.llm_requests_per_minute),
+                "fallback": TokenBucket(settings.llm_fallback_requests_per_minute),
+            }
+            self._tokens = {
+                "primary": TokenBucket(settings.llm_tokens_per_minute),
+                "fallback": TokenBucket(settings.llm_fallback_tokens_per_minute),
+            }
+
+        asyncio.run_coroutine_threadsafe(_setup(), self._loop).result()
+
+    async def acomplete(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        model: Optional[str] = None,
+        temperature: float = 0.0,
+        max_tokens: Optional[int] = None,
+        provider: str = "primary",
+        priority: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Optional[str]:
+        """Message content of one chat completion with a single model (None if the
+        response has none).
+
+        429, 5xx, timeouts and connection errors are retried with backoff up to
+        `llm_max_retries` times; the last error is raised once retries run out.
+        The request waits for a slot of its priority class (default: the caller's
+        llm_priority context) before taking rate-limit budget of `provider`. Each
+        provider request's own latency and outcome go to the call policy stats.
+        Must be awaited on this client's loop (see `complete` for other threads).
+        """
+        priority = priority or current_priority()
+        estimate = _estimate_tokens(messages, max_tokens)
+        params: Dict[str, Any] = {"model": model or self.default_model, "messages": messages, "temperature": temperature}
+        if max_tokens:
+            params["max_tokens"] = max_tokens
+        params.update(kwargs)
+        gate, requests, tokens = self._gates[provider], self._requests[provider], self._tokens[provider]
+        attempt = 0
+        while True:
+            await gate.acquire(priority)
+            error: Optional[Exception] = None
+            try:
+                await requests.acquire()
+                await tokens.acquire(estimate)
+                sent = time.monotonic()
+                completion = await self._clients[provider].chat.completions.create(**params)
+                call_policy.record_call(params["model"], time.monotonic() - sent, ok=True)
+            except Exception as exc:  # noqa: BLE001
+                error = exc
+                _record_error(params["model"], exc)
+            finally:
+                # Also on cancellation (deadline or a hedge that lost)
+                gate.release(priority)
+            if error is not None:
+                tokens.adjust(-estimate)
+                if not _is_retryable(error) or attempt >= self.max_retries:
+                    raise error
+                delay = _retry_delay(error, attempt)
+                attempt += 1
+                logger.info("LLM request failed (%s), retry %d in %.1fs", error, attempt, delay)
+                await asyncio.sleep(delay)
+                continue
+            usage = getattr(completion, "usage", None)
+            if usage is not None and getattr(usage, "total_tokens", None):
+                tokens.adjust(usage.total_tokens - estimate)
+            if not completion or not getattr(completion, "choices", None):
+                return None
+            message = getattr(completion.choices[0], "message", None)
+            return getattr(message, "content", None)
+
+    async def astream(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        model: Optional[str] = None,
+        temperature: float = 0.0,
+        max_tokens: Optional[int] = None,
+        provider: str = "primary",
+        priority: Optional[str] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[str]:
+        """Content deltas of one streamed chat completion with a single model.
+
+        Admission, rate limits and retries work as in `acomplete`, except that an error
+        after the first delta is raised rather than retried: the caller already holds a
+        partial answer and decides what to re-request. The priority slot is held until
+        the stream ends. The stats get the time from sending the request to the end of
+        the stream (or to the caller closing it once it has what it needs).
+        """
+        priority = priority or current_priority()
+        estimate = _estimate_tokens(messages, max_tokens)
+        params: Dict[str, Any] = {
+            "model": model or self.default_model,
+            "messages": messages,
+            "temperature": temperature,
+            "stream": True,
+        }
+        if max_tokens:
+            params["max_tokens"] = max_tokens
+        params.update(kwargs)
+        gate, requests, tokens = self._gates[provider], self._requests[provider], self._tokens[provider]
+        attempt = 0
+        while True:
+            await gate.acquire(priority)
+            started = False
+            sent: Optional[float] = None
+            error: Optional[Exception] = None
+            try:
+                await requests.acquire()
+                await tokens.acquire(estimate)
+                sent = time.monotonic()
+                stream = await self._clients[provider].chat.completions.create(**params)
+                async for chunk in stream:
+                    choices = getattr(chunk, "choices", None)
+                    delta = getattr(choices[0], "delta", None) if choices else None
+                    content = getattr(delta, "content", None)
+                    if content:
+                        if not started:
+                            started = True
+                            call_policy.record_first_token(params["model"], time.monotonic() - sent)
+                        yield content
+            except (asyncio.CancelledError, GeneratorExit):
+                # The caller stopped reading, usually because the JSON array is complete
+                if started and sent is not None:
+                    call_policy.record_call(params["model"], time.monotonic() - sent, ok=True)
+                raise
+            except Exception as exc:  # noqa: BLE001
+                if sent is not None:
+                    _record_error(params["model"], exc)
+                if started:
+                    raise
+                error = exc
+            finally:
+                gate.release(priority)
+            if error is None:
+                call_policy.record_call(params["model"], time.monotonic() - sent, ok=True)
+                return
+            tokens.adjust(-estimate)
+            if not _is_retryable(error) or attempt >= self.max_retries:
+                raise error
+            delay = _retry_delay(error, attempt)
+            attempt += 1
+            logger.info("LLM stream failed (%s), retry %d in %.1fs", error, attempt, delay)
+            await asyncio.sleep(delay)
+
+    async def acomplete_with_policy(self, messages: List[Dict[str, str]], **kwargs: Any) -> Optional[str]:
+        """`acomplete` under the call policy: deadline, hedging and model failover."""
+        return await call_policy.execute(self, messages, **kwargs)
+
+    def complete(self, messages: List[Dict[str, str]], **kwargs: Any) -> Optional[str]:
+        """Blocking `acomplete_with_policy` for synchronous callers; safe to call from many
+        threads. The calling thread's llm_priority class travels with the request.
+        """
+        kwargs.setdefault("priority", current_priority())
+        return asyncio.run_coroutine_threadsafe(self.acomplete_with_policy(messages, **kwargs), self._loop).result()
+
+    def stream(self, messages: List[Dict[str, str]], **kwargs: Any) -> Iterator[str]:
+        """Blocking iterator over the content deltas of a streamed completion.
+
+        The stream is opened by `call_policy.open_stream` (failover, and a hedge to the
+        fallback model when the first token is late) and must end within
+        `llm_call_deadline_seconds`, else asyncio.TimeoutError is raised mid-iteration.
+        """
+        settings = get_settings()
+        kwargs.setdefault("priority", current_priority())
+        kwargs.pop("provider", None)
+        pieces: "queue.Queue[Any]" = queue.Queue()
+
+        async def _produce() -> None:
+            deadline = self._loop.time() + settings.llm_call_deadline_seconds
+            deltas: Optional[AsyncIterator[str]] = None
+            model = kwargs.get("model") or self.default_model
+            try:
+                deltas, piece, model = await asyncio.wait_for(
+                    call_policy.open_stream(self, messages, **kwargs), timeout=settings.llm_call_deadline_seconds
+                )
+                while piece is not None:
+                    pieces.put(piece)
+                    try:
+                        piece = await asyncio.wait_for(deltas.__anext__(), timeout=max(0.0, deadline - self._loop.time()))
+                    except StopAsyncIteration:
+                        break
+            except Exception as exc:  # noqa: BLE001
+                if isinstance(exc, asyncio.TimeoutError):
+                    logger.warning("LLM stream from %s missed its %.0fs deadline", model, settings.llm_call_deadline_seconds)
+                pieces.put(exc)
+                return
+            finally:
+                if deltas is not None:
+                    await deltas.aclose()
+            pieces.put(_STREAM_END)
+
+        future = asyncio.run_coroutine_threadsafe(_produce(), self._loop)
+        try:
+            while True:
+                piece = pieces.get()
+                if piece is _STREAM_END:
+                    return
+                if isinstance(piece, BaseException):
+                    raise piece
+                yield piece
+        finally:
+            # The caller stopped early (array closed, or an error): free the slot
+            future.cancel()
+
+    def queue_metrics(self) -> Dict[str, Any]:
+        return {**self._gates["primary"].snapshot(), "fallback": self._gates["fallback"].snapshot()}
+
+    def close(self) -> None:
+        async def _close() -> None:
+            for http in self._http.values():
+                await http.aclose()
+
+        asyncio.run_coroutine_threadsafe(_close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+_llm_client: Optional[LLMClient] = None
+_llm_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """The process-wide LLM client; raises RuntimeError when no API key is configured."""
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is None:
+            _llm_client = LLMClient()
+        return _llm_client
+
+
+def llm_queue_metrics() -> Optional[Dict[str, Any]]:
+    """Per-priority-class queue stats of the running client (None before the first call)."""
+    with _llm_client_lock:
+        client = _llm_client
+    return client.queue_metrics() if client is not None else None
+
+
+def close_llm_client() -> None:
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is not None:
+            _llm_client.close()
+            _llm_client = None
 
 
+def strip_code_fence(content: str) -> str:
+    """Remove a surrounding ```json fence that models sometimes add around JSON output."""
+    raw = content.strip()
+    if raw.startswith("```"):
+        raw = raw.strip("` ")
+        if raw.startswith("json"):
+            raw = raw[4:].strip()
+    return raw
@@ -0,0 +1,353 @@
+"""Local health pre-classifier that answers confident items without an LLM call.
+
+A logistic regression over hashed unigram/bigram features, trained from stored
+mentions (status labels) plus the LLM's own past decisions:
+
+    python -m app.llm.preclassifier train
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import threading
+import zlib
+
+from app.config import get_settings
+from app.utils.keyword_matcher import fold_text
+
+
+logger = logging.getLogger(__name__)
+
+MODEL_VERSION = 1
+N_FEATURES = 2**18
+# Holdout predictions kept in the model file for threshold stats
+_MAX_HOLDOUT = 5000
+_SWEEP_THRESHOLDS = (0.8, 0.85, 0.9, 0.95, 0.98)
+
+
+def features(text: str) -> Dict[int, float]:
+    """L2-normalized hashed unigram + bigram counts of the folded text."""
+    tokens = fold_text(text).split()
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    counts: Dict[int, float] = {}
+    for gram in grams:
+        idx = zlib.crc32(gram.encode("utf-8")) % N_FEATURES
+        counts[idx] = counts.get(idx, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+    return {idx: v / norm for idx, v in counts.items()}
+
+
+def _sigmoid(z: float) -> float:
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    e = math.exp(z)
+    return e / (1.0 + e)
+
+
+class PreClassifier:
+    def __init__(self, weights: Optional[Dict[int, float]] = None, bias: float = 0.0, meta: Optional[Dict[str, Any]] = None) -> None:
+        self.weights: Dict[int, float] = weights or {}
+        self.bias = bias
+        self.meta: Dict[str, Any] = meta or {}
+
+    def predict_proba(self, text: str) -> float:
+        """Probability that `text` (title + summary) is health-related."""
+        w = self.weights
+        z = self.bias + sum(w.get(idx, 0.0) * v for idx, v in features(text).items())
+        return _sigmoid(z)
+
+    @classmethod
+    def train(
+        cls,
+        examples: Sequence[Tuple[str, bool]],
+        *,
+        epochs: int = 8,
+        learning_rate: float = 0.5,
+        l2: float = 1e-6,
+        seed: int = 13,
+    ) -> "PreClassifier":
+        """SGD on class-balanced log loss over (text, is_health) pairs."""
+        data = [(features(text), 1.0 if label else 0.0) for text, label in examples]
+        positives = sum(y for _, y in data)
+        negatives = len(data) - positives
+        # Balance classes so a skewed label mix does not just learn the prior
+        pos_weight = len(data) / (2 * positives) if positives else 1.0
+        neg_weight = len(data) / (2 * negatives) if negatives else 1.0
+        weights: Dict[int, float] = {}
+        bias = 0.0
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(data)
+            lr = learning_rate / (1 + epoch)
+            for x, y in data:
+                z = bias + sum(weights.get(idx, 0.0) * v for idx, v in x.items())
+                grad = (_sigmoid(z) - y) * (pos_weight if y else neg_weight)
+                bias -= lr * grad
+                for idx, v in x.items():
+                    w = weights.get(idx, 0.0)
+                    weights[idx] = w - lr * (grad * v + l2 * w)
+        return cls({idx: w for idx, w in weights.items() if abs(w) > 1e-6}, bias)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": MODEL_VERSION,
+            "n_features": N_FEATURES,
+            "bias": self.bias,
+            "weights": {str(idx): round(w, 6) for idx, w in self.weights.items()},
+            **self.meta,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PreClassifier":
+        if data.get("version") != MODEL_VERSION or data.get("n_features") != N_FEATURES:
+            raise ValueError("incompatible pre-classifier model file")
+        meta = {k: v for k, v in data.items() if k not in {"version", "n_features", "bias", "weights"}}
+        return cls({int(idx): float(w) for idx, w in data["weights"].items()}, float(data["bias"]), meta)
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self.to_dict(), fh)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "PreClassifier":
+        with open(path, encoding="utf-8") as fh:
+            return cls.from_dict(json.load(fh))
+
+
+def threshold_stats(holdout: Sequence[Tuple[float, int]], accept: float, reject: float) -> Dict[str, Any]:
+    """How a holdout set splits between auto-accept, auto-reject and the LLM at the
+    given thresholds, and how accurate the automatic decisions were.
+    """
+    total = len(holdout)
+    accepted = [y for p, y in holdout if p >= accept]
+    rejected = [y for p, y in holdout if p <= reject]
+    return {
+        "accept_threshold": accept,
+        "reject_threshold": reject,
+        "auto_accept_rate": round(len(accepted) / total, 4) if total else None,
+        "auto_accept_precision": round(sum(accepted) / len(accepted), 4) if accepted else None,
+        "auto_reject_rate": round(len(rejected) / total, 4) if total else None,
+        "auto_reject_npv": round(1 - sum(rejected) / len(rejected), 4) if rejected else None,
+        "llm_rate": round(1 - (len(accepted) + len(rejected)) / total, 4) if total else None,
+    }
+
+
+def calibration(holdout: Sequence[Tuple[float, int]], bins: int = 10) -> Dict[str, Any]:
+    """Reliability bins, Brier score and log loss of holdout predictions."""
+    if not holdout:
+        return {}
+    table = []
+    for b in range(bins):
+        lower, upper = b / bins, (b + 1) / bins
+        members = [(p, y) for p, y in holdout if lower <= p < upper or (b == bins - 1 and p == 1.0)]
+        if members:
+            table.append(
+                {
+                    "lower": lower,
+                    "upper": upper,
+                    "count": len(members),
+                    "mean_predicted": round(sum(p for p, _ in members) / len(members), 4),
+                    "observed_rate": round(sum(y for _, y in members) / len(members), 4),
+                }
+            )
+    eps = 1e-9
+    return {
+        "bins": table,
+        "brier": round(sum((p - y) ** 2 for p, y in holdout) / len(holdout), 4),
+        "log_loss": round(
+            -sum(y * math.log(max(p, eps)) + (1 - y) * math.log(max(1 - p, eps)) for p, y in holdout) / len(holdout), 4
+        ),
+        "accuracy": round(sum(1 for p, y in holdout if (p >= 0.5) == bool(y)) / len(holdout), 4),
+    }
+
+
+_model: Optional[PreClassifier] = None
+_model_loaded = False
+_model_lock = threading.Lock()
+_decisions: Dict[str, int] = {"accepted": 0, "rejected": 0, "uncertain": 0}
+_examples_lock = threading.Lock()
+
+
+def load_preclassifier(force: bool = False) -> Optional[PreClassifier]:
+    """Load the trained model once per process; None when disabled or not trained yet."""
+    global _model, _model_loaded
+    settings = get_settings()
+    if not settings.preclassifier_enabled:
+        return None
+    with _model_lock:
+        if force or not _model_loaded:
+            _model_loaded = True
+            _model = None
+            if os.path.exists(settings.preclassifier_model_path):
+                try:
+                    _model = PreClassifier.load(settings.preclassifier_model_path)
+                    logger.info("Loaded health pre-classifier from %s", settings.preclassifier_model_path)
+                except Exception as exc:  # noqa: BLE001
+                    logger.warning("Failed to load pre-classifier %s: %s", settings.preclassifier_model_path, exc)
+        return _model
+
+
+def gate(texts: Sequence[str]) -> List[Optional[bool]]:
+    """True/False for texts the local model is confident about, None for the uncertain
+    band that still needs the LLM. All None when no model is loaded.
+    """
+    model = load_preclassifier()
+    if model is None:
+        return [None] * len(texts)
+    settings = get_settings()
+    decisions: List[Optional[bool]] = []
+    for text in texts:
+        p = model.predict_proba(text)
+        if p >= settings.preclassifier_accept_threshold:
+            decisions.append(True)
+        elif p <= settings.preclassifier_reject_threshold:
+            decisions.append(False)
+        else:
+            decisions.append(None)
+    with _model_lock:
+        _decisions["accepted"] += sum(1 for d in decisions if d is True)
+        _decisions["rejected"] += sum(1 for d in decisions if d is False)
+        _decisions["uncertain"] += sum(1 for d in decisions if d is None)
+    return decisions
+
+
+def record_examples(texts: Sequence[str], labels: Sequence[Optional[bool]]) -> None:
+    """Append LLM health decisions to the training log (None labels are skipped)."""
+    settings = get_settings()
+    if not settings.preclassifier_enabled:
+        return
+    rows = [
+        json.dumps({"text": text, "is_health": label}, ensure_ascii=False)
+        for text, label in zip(texts, labels)
+        if label is not None and text.strip()
+    ]
+    if not rows:
+        return
+    path = settings.preclassifier_examples_path
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with _examples_lock, open(path, "a", encoding="utf-8") as fh:
+            fh.write("\n".join(rows) + "\n")
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Failed to record pre-classifier examples: %s", exc)
+
+
+def preclassifier_metrics() -> Dict[str, Any]:
+    settings = get_settings()
+    model = load_preclassifier()
+    with _model_lock:
+        decisions = dict(_decisions)
+    decided = decisions["accepted"] + decisions["rejected"]
+    total = decided + decisions["uncertain"]
+    metrics: Dict[str, Any] = {
+        "enabled": settings.preclassifier_enabled,
+        "loaded": model is not None,
+        "decisions": decisions,
+        "llm_calls_saved_rate": round(decided / total, 4) if total else None,
+    }
+    if model is not None:
+        holdout = [(float(p), int(y)) for p, y in model.meta.get("holdout", [])]
+        metrics.update(
+            {
+                "trained_at": model.meta.get("trained_at"),
+                "examples": model.meta.get("examples"),
+                "calibration": model.meta.get("calibration"),
+                "holdout_at_current_thresholds": threshold_stats(
+                    holdout, settings.preclassifier_accept_threshold, settings.preclassifier_reject_threshold
+                ),
+                "threshold_sweep": [threshold_stats(holdout, t, round(1 - t, 4)) for t in _SWEEP_THRESHOLDS],
+            }
+        )
+    return metrics
+
+
+def iter_training_examples() -> Iterator[Tuple[str, bool]]:
+    """Stored mentions labeled by status (negative statuses -> False), then the logged
+    LLM decisions.
+    """
+    from app.db.supabase_client import iter_labeled_mentions
+
+    settings = get_settings()
+    negative = {s.lower() for s in settings.preclassifier_negative_statuses}
+    for row in iter_labeled_mentions():
+        text = " ".join([row.get("headline") or "", row.get("summary") or ""]).strip()
+        if text:
+            yield text, (row.get("status") or "").lower() not in negative
+    path = settings.preclassifier_examples_path
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(row.get("is_health"), bool) and row.get("text"):
+                    yield row["text"], row["is_health"]
+
+
+def train_from_store(holdout_fraction: float = 0.2, epochs: int = 8, seed: int = 13) -> PreClassifier:
+    """Train on deduplicated labeled examples, keeping a holdout split for calibration."""
+    by_text: Dict[str, bool] = {}
+    for text, label in iter_training_examples():
+        # Later sources (the LLM log) do not override a human status label
+        by_text.setdefault(fold_text(text), label)
+    examples = list(by_text.items())
+    positives = sum(1 for _, label in examples if label)
+    if not positives or positives == len(examples):
+        raise ValueError(
+            f"need both positive and negative examples (got {positives} positive of {len(examples)})"
+        )
+    rng = random.Random(seed)
+    rng.shuffle(examples)
+    split = int(len(examples) * (1 - holdout_fraction))
+    train_set, holdout_set = examples[:split], examples[split:]
+    model = PreClassifier.train(train_set, epochs=epochs, seed=seed)
+    holdout = [(round(model.predict_proba(text), 4), int(label)) for text, label in holdout_set]
+    model.meta = {
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+        "examples": {"train": len(train_set), "holdout": len(holdout_set), "positive": positives, "negative": len(examples) - positives},
+        "calibration": calibration(holdout),
+        "holdout": holdout[:_MAX_HOLDOUT],
+    }
+    return model
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.llm.preclassifier")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train = sub.add_parser("train", help="train from stored mentions and logged LLM decisions")
+    train.add_argument("--output", default=None, help="model path (default PRECLASSIFIER_MODEL_PATH)")
+    train.add_argument("--holdout", type=float, default=0.2, help="fraction held out for calibration")
+    train.add_argument("--epochs", type=int, default=8)
+    sub.add_parser("stats", help="print calibration and threshold stats of the saved model")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    settings = get_settings()
+    if args.command == "train":
+        model = train_from_store(holdout_fraction=args.holdout, epochs=args.epochs)
+        path = args.output or settings.preclassifier_model_path
+        model.save(path)
+        print(f"saved pre-classifier to {path}")
+        print(json.dumps({"examples": model.meta["examples"], "calibration": model.meta["calibration"]}, indent=2))
+    else:
+        print(json.dumps(preclassifier_metrics(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
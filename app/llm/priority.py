@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator
+import asyncio
+import time
+
+
+# Priority classes of LLM work, most urgent first
+INTERACTIVE = "interactive"
+INGEST = "ingest"
+BACKGROUND = "background"
+PRIORITY_CLASSES = (INTERACTIVE, INGEST, BACKGROUND)
+# Share of free slots each waiting class gets under contention
+WEIGHTS = {INTERACTIVE: 8, INGEST: 3, BACKGROUND: 1}
+
+_current: ContextVar[str] = ContextVar("llm_priority", default=INGEST)
+
+
+def current_priority() -> str:
+    return _current.get()
+
+
+@contextmanager
+def llm_priority(priority: str) -> Iterator[None]:
+    """Tag LLM calls made in this context (and in run_chunked workers) with `priority`."""
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"unknown LLM priority class {priority!r}")
+    token = _current.set(priority)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+class PriorityGate:
+    """Admission control for in-flight LLM requests on one event loop.
+
+    At most `total` requests run at once and at most `limits[cls]` per class. When
+    several classes are waiting, free slots are shared by stride scheduling with
+    WEIGHTS, so interactive work overtakes queued background work without starving it.
+    """
+
+    def __init__(self, total: int, limits: Dict[str, int]) -> None:
+        self.total = max(1, total)
+        # A missing or zero class limit means the class may use every slot
+        self.limits = {cls: min(self.total, limits.get(cls) or self.total) for cls in PRIORITY_CLASSES}
+        self._in_flight = dict.fromkeys(PRIORITY_CLASSES, 0)
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {cls: deque() for cls in PRIORITY_CLASSES}
+        self._pass = dict.fromkeys(PRIORITY_CLASSES, 0.0)
+        self._stats = {cls: {"admitted": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0} for cls in PRIORITY_CLASSES}
+
+    async def acquire(self, cls: str) -> None:
+        loop = asyncio.get_running_loop()
+        if not self._waiters[cls] and self._in_flight[cls] == 0:
+            # A class returning from idle starts level with the active classes instead of
+            # cashing in the credit it built up while idle
+            active = [self._pass[c] for c in PRIORITY_CLASSES if c != cls and (self._waiters[c] or self._in_flight[c])]
+            if active:
+                self._pass[cls] = max(self._pass[cls], min(active))
+        fut = loop.create_future()
+        self._waiters[cls].append(fut)
+        started = time.monotonic()
+        self._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Admitted just before the cancellation landed: hand the slot back
+                self.release(cls)
+            else:
+                try:
+                    self._waiters[cls].remove(fut)
+                except ValueError:
+                    pass
+            raise
+        waited = (time.monotonic() - started) * 1000
+        stats = self._stats[cls]
+        stats["admitted"] += 1
+        stats["wait_ms_total"] += waited
+        stats["wait_ms_max"] = max(stats["wait_ms_max"], waited)
+
+    def release(self, cls: str) -> None:
+        self._in_flight[cls] -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while sum(self._in_flight.values()) < self.total:
+            eligible = [
+                cls for cls in PRIORITY_CLASSES
+                if self._waiters[cls] and self._in_flight[cls] < self.limits[cls]
+            ]
+            if not eligible:
+                return
+            cls = min(eligible, key=lambda c: (self._pass[c], PRIORITY_CLASSES.index(c)))
+            fut = self._waiters[cls].popleft()
+            if fut.done():
+                continue
+            self._in_flight[cls] += 1
+            self._pass[cls] += 1.0 / WEIGHTS[cls]
+            fut.set_result(None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        result = {}
+        for cls in PRIORITY_CLASSES:
+            stats = self._stats[cls]
+            admitted = stats["admitted"]
+            result[cls] = {
+                "limit": self.limits[cls],
+                "in_flight": self._in_flight[cls],
+                "waiting": len(self._waiters[cls]),
+                "admitted": admitted,
+                "avg_wait_ms": round(stats["wait_ms_total"] / admitted, 1) if admitted else None,
+                "max_wait_ms": round(stats["wait_ms_max"], 1),
+            }
+        return result
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+import re
+import threading
+import time
+
+from app.location.gazetteer import get_gazetteer
+from app.utils.extractive_summary import BOILERPLATE_MARKERS, split_sentences, strip_html
+from app.utils.keyword_matcher import fold_text, get_keyword_matcher
+
+
+logger = logging.getLogger(__name__)
+
+_URL = re.compile(r"https?://\S+|www\.\S+")
+CHARS_PER_TOKEN = 4
+# Tracked keywords are re-read from the keyword table at most this often
+_KEYWORDS_TTL_SECONDS = 300
+
+_keywords: Tuple[str, ...] = ()
+_keywords_loaded_at = 0.0
+_savings: Dict[str, Dict[str, int]] = {}
+_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def tracked_keywords() -> Tuple[str, ...]:
+    """Active keywords used to rank passages, cached for a few minutes."""
+    global _keywords, _keywords_loaded_at
+    now = time.monotonic()
+    with _lock:
+        if now - _keywords_loaded_at < _KEYWORDS_TTL_SECONDS:
+            return _keywords
+    try:
+        from app.db.supabase_client import list_keywords
+
+        keywords = tuple(k["keyword"] for k in list_keywords())
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Failed to load tracked keywords for prompt building: %s", exc)
+        keywords = _keywords
+    with _lock:
+        _keywords, _keywords_loaded_at = keywords, now
+    return keywords
+
+
+def clean_text(text: str) -> str:
+    """Plain text without HTML, URLs, boilerplate sentences or repeated sentences."""
+    plain = _URL.sub(" ", strip_html(text or ""))
+    kept: List[str] = []
+    seen = set()
+    for sentence in split_sentences(" ".join(plain.split())):
+        folded = fold_text(sentence)
+        if not folded.strip() or folded in seen or any(marker in folded for marker in BOILERPLATE_MARKERS):
+            continue
+        seen.add(folded)
+        kept.append(sentence)
+    return " ".join(kept)
+
+
+def drop_title_overlap(title: str, text: str) -> str:
+    """`text` without a leading copy of `title` or sentences that just repeat it."""
+    title_folded = fold_text(title).strip()
+    if not title_folded or not text:
+        return text
+    words = text.split()
+    n = len(title_folded.split())
+    if fold_text(" ".join(words[:n])).strip() == title_folded:
+        text = " ".join(words[n:]).lstrip(" -:|.")
+    return " ".join(s for s in split_sentences(text) if fold_text(s).strip() != title_folded)
+
+
+def select_passages(text: str, budget_tokens: int, keywords: Sequence[str] = ()) -> str:
+    """Sentences of `text` that fit `budget_tokens`: the lead first, then sentences by
+    keyword and location hits, emitted in original order with gaps marked by "...".
+    """
+    if estimate_tokens(text) <= budget_tokens:
+        return text
+    sentences = split_sentences(text)
+    matcher = get_keyword_matcher(keywords)
+    gazetteer = get_gazetteer()
+    scored = []
+    for position, sentence in enumerate(sentences):
+        score = 2.0 * len(matcher.counts(sentence)) + (1.0 if gazetteer.resolve(sentence) else 0.0)
+        if position == 0:
+            score += 10.0
+        scored.append((-score, position))
+    chosen: List[int] = []
+    used = 0
+    for _, position in sorted(scored):
+        cost = estimate_tokens(sentences[position]) + 1
+        if used + cost <= budget_tokens:
+            chosen.append(position)
+            used += cost
+    if not chosen:
+        # Not even the lead fits: cut it at the budget
+        return text[: budget_tokens * CHARS_PER_TOKEN].rsplit(" ", 1)[0] + " ..."
+    parts: List[str] = []
+    previous = -1
+    for position in sorted(chosen):
+        if previous >= 0 and position != previous + 1:
+            parts.append("...")
+        parts.append(sentences[position])
+        previous = position
+    return " ".join(parts)
+
+
+def _record(module: str, raw: int, sent: int) -> None:
+    with _lock:
+        stats = _savings.setdefault(module, {"calls": 0, "raw_tokens": 0, "sent_tokens": 0})
+        stats["calls"] += 1
+        stats["raw_tokens"] += raw
+        stats["sent_tokens"] += sent
+
+
+def prepare_item(
+    module: str,
+    title: str,
+    text: str,
+    budget_tokens: int,
+    keywords: Optional[Sequence[str]] = None,
+) -> Tuple[str, str]:
+    """Prompt-ready (title, text): HTML/boilerplate stripped, whitespace collapsed, the
+    title's copy removed from the text, and the text cut to the passages mentioning
+    tracked keywords or locations within `budget_tokens`. Savings are tallied per module.
+    """
+    clean_title = " ".join(strip_html(title or "").split())
+    body = drop_title_overlap(clean_title, clean_text(text or ""))
+    body = select_passages(body, budget_tokens, tracked_keywords() if keywords is None else keywords)
+    _record(module, estimate_tokens((title or "") + (text or "")), estimate_tokens(clean_title + body))
+    return clean_title, body
+
+
+def prompt_savings() -> Dict[str, Dict[str, object]]:
+    with _lock:
+        snapshot = {module: dict(stats) for module, stats in _savings.items()}
+    for stats in snapshot.values():
+        saved = stats["raw_tokens"] - stats["sent_tokens"]
+        stats["saved_tokens"] = saved
+        stats["saved_pct"] = round(100 * saved / stats["raw_tokens"], 1) if stats["raw_tokens"] else None
+    return snapshot
@@ -1,59 +1,107 @@
 from __future__ import annotations
 
-from typing import List
+from typing import Dict, List, Optional, Sequence
 import json
 
-from app.config import get_settings
-from app.llm.openrouter_client import get_openrouter_client
+from app.config import SummaryPolicy, get_settings
+from app.llm.adaptive_batch import plan_chunks
+from app.llm.batching import run_chunked
+from app.llm.cache import cached_batch
+from app.llm.json_stream import complete_json_array
+from app.llm.openrouter_client import get_llm_client
+from app.llm.prompt_builder import prepare_item
+from app.utils.extractive_summary import extractive_summary
+
+
+PROMPT_VERSION = "v1"
+
+SYSTEM_PROMPT = (
+    "You are a concise summarizer. For each object in the JSON array of {title, text},"
+    " produce ONE neutral, factual sentence (<= 30 words) summarizing the main health-related point."
+    " Respond ONLY with a JSON array of strings in the same order."
+)
+
+
+def _summarize_messages(chunk: Sequence[dict]) -> List[Dict[str, str]]:
+    budget = get_settings().llm_item_token_budget
+    prepared = [prepare_item("summarizer", it.get("title") or "", it.get("text") or "", budget) for it in chunk]
+    payload = json.dumps([{"title": title, "text": text} for title, text in prepared])
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": payload},
+    ]
+
+
+def _summarize_chunk(client, model: str, chunk: List[dict]) -> List[Optional[str]]:
+    # Empty summaries count as failures (not cached)
+    return complete_json_array(
+        client,
+        chunk,
+        _summarize_messages,
+        lambda x: str(x) if x else None,
+        task="summarizer",
+        model=model,
+        temperature=0.2,
+    )
 
 
 def summarize_batch(items: List[dict]) -> List[str]:
-    """Summarize a batch of items. Each item: {"title": str, "text": str}
-    Returns a list of single-sentence summaries (<=30 words). Falls back to empty string on error.
+    """Summarize a batch of items in adaptively sized chunks, running up to
+    `llm_batch_concurrency` requests at once; summaries are cached per item.
+    Each item: {"title": str, "text": str}
+    Returns single-sentence summaries (<=30 words) in input order; items of a failed
+    chunk get an empty string.
     """
     settings = get_settings()
     try:
-        client = get_openrouter_client()
+        client = get_llm_client()
     except Exception:
         # No LLM configured
         return [""] * len(items)
 
-    payload = json.dumps(
-        [{"title": it.get("title") or "", "text": it.get("text") or ""} for it in items]
-    )
-    system = (
-        "You are a concise summarizer. For each object in the JSON array of {title, text},"
-        " produce ONE neutral, factual sentence (<= 30 words) summarizing the main health-related point."
-        " Respond ONLY with a JSON array of strings in the same order."
+    results = cached_batch(
+        "summary",
+        PROMPT_VERSION,
+        settings.openrouter_model,
+        items,
+        lambda it: {"title": it.get("title") or "", "text": it.get("text") or ""},
+        lambda misses: run_chunked(
+            misses,
+            lambda chunk: _summarize_chunk(client, settings.openrouter_model, list(chunk)),
+            planner=lambda misses: plan_chunks("summarizer", misses, SYSTEM_PROMPT),
+            max_workers=settings.llm_batch_concurrency,
+        ),
     )
-
-    try:
-        completion = client.chat.completions.create(
-            model=settings.openrouter_model,
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": payload},
-            ],
-            temperature=0.2,
-        )
-        if not completion or not getattr(completion, "choices", None):
-            return [""] * len(items)
-        first = completion.choices[0]
-        message = getattr(first, "message", None)
-        content = getattr(message, "content", None)
-        if not content:
-            return [""] * len(items)
-        raw = content.strip()
-        if raw.startswith("```"):
-            raw = raw.strip("` ")
-            if raw.startswith("json"):
-                raw = raw[4:].strip()
-        data = json.loads(raw)
-        if isinstance(data, list):
-            # ensure all are strings
-            return [str(x) if x is not None else "" for x in data][: len(items)]
-        return [""] * len(items)
-    except Exception:
-        return [""] * len(items)
+    return ["" if summary is None else summary for summary in results]
 
 
+def summarize_with_policy(
+    items: List[dict], keywords: List[str], policy: Optional[SummaryPolicy] = None
+) -> List[str]:
+    """Summaries under `summary_policy` (or `policy`):
+    - "llm": every item goes to summarize_batch
+    - "extractive": local extractive summaries only, no LLM call
+    - "tiered": only items with {"priority": "high"} go to the LLM
+    Items the LLM was not asked about or failed on get an extractive summary.
+    Each item: {"title": str, "text": str, "priority": "high" | "low"} plus an optional
+    "body" to extract from instead of "text"; `keywords` are the active keywords used
+    to score sentences.
+    """
+    policy = policy or get_settings().summary_policy
+    if policy == "extractive":
+        llm_indexes: List[int] = []
+    elif policy == "tiered":
+        llm_indexes = [i for i, it in enumerate(items) if it.get("priority") == "high"]
+    elif policy == "llm":
+        llm_indexes = list(range(len(items)))
+    else:
+        raise ValueError(f"unknown summary policy {policy!r}")
+    summaries = [""] * len(items)
+    if llm_indexes:
+        for i, summary in zip(llm_indexes, summarize_batch([items[i] for i in llm_indexes])):
+            summaries[i] = summary
+    return [
+        summary
+        or extractive_summary(it.get("body", it.get("text")) or "", title=it.get("title") or "", keywords=keywords)
+        for it, summary in zip(items, summaries)
+    ]
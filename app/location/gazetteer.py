@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.location.locations import LOCATION_ALIASES, MALAYSIA_DISTRICTS
+from app.utils.keyword_matcher import KeywordMatcher
+
+
+# District names that are also everyday words or personal names ("pekan" is Malay for
+# "town"); they only count when their state is mentioned too.
+WEAK_DISTRICTS = {"Pekan", "Yan", "Sik", "Bera", "Jeli", "Marang", "Raub", "Papar", "Maran", "Kapit"}
+
+# "Penang" duplicates "Pulau Pinang" in MALAYSIA_DISTRICTS; report the official name
+_STATE_ALIASES = {"Penang": "Pulau Pinang"}
+
+
+class Gazetteer:
+    """Every state, district and alias compiled into one matcher, resolved in a single
+    pass over the text.
+    """
+
+    def __init__(self) -> None:
+        # term -> list of (state, district or None, weak)
+        self._terms: Dict[str, List[Tuple[str, Optional[str], bool]]] = {}
+        for state, districts in MALAYSIA_DISTRICTS.items():
+            canonical_state = _STATE_ALIASES.get(state, state)
+            self._add(state, canonical_state, None)
+            for district in districts:
+                self._add(district, canonical_state, district, weak=district in WEAK_DISTRICTS)
+        for alias, (state, district) in LOCATION_ALIASES.items():
+            self._add(alias, state, district)
+        self._matcher = KeywordMatcher(self._terms)
+
+    def _add(self, term: str, state: str, district: Optional[str], weak: bool = False) -> None:
+        entries = self._terms.setdefault(term, [])
+        if (state, district, weak) not in entries:
+            entries.append((state, district, weak))
+
+    def resolve(self, text: str) -> Optional[Dict[str, str]]:
+        """Most specific location in `text`: a district (preferring one whose state is
+        also mentioned), else the first state mentioned.
+        """
+        if not text:
+            return None
+        states: List[str] = []
+        districts: List[Tuple[str, str, bool]] = []
+        for _, _, term in self._matcher.find_iter(text):
+            for state, district, weak in self._terms[term]:
+                if district is None:
+                    if state not in states:
+                        states.append(state)
+                else:
+                    districts.append((state, district, weak))
+        mentioned: Set[str] = set(states)
+        for state, district, _ in districts:
+            if state in mentioned:
+                return {"state": state, "district": district}
+        for state, district, weak in districts:
+            if not weak:
+                return {"state": state, "district": district}
+        if states:
+            return {"state": states[0]}
+        return None
+
+
+_gazetteer: Optional[Gazetteer] = None
+
+
+def get_gazetteer() -> Gazetteer:
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = Gazetteer()
+    return _gazetteer
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional, Tuple
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
 
 
 MALAYSIA_DISTRICTS: Dict[str, List[str]] = {
@@ -64,43 +65,127 @@ MALAYSIA_DISTRICTS: Dict[str, List[str]] = {
     "Labuan": ["Labuan"],
 }
 
+# Common names, abbreviations and major towns -> (state, district or None).
+# Keys are matched case-insensitively as whole words.
+LOCATION_ALIASES: Dict[str, Tuple[str, Optional[str]]] = {
+    # States
+    "Penang": ("Pulau Pinang", None),
+    "Pulau Pinang": ("Pulau Pinang", None),
+    "Malacca": ("Melaka", None),
+    "Johore": ("Johor", None),
+    "Trengganu": ("Terengganu", None),
+    "Negri Sembilan": ("Negeri Sembilan", None),
+    "Seberang Perai": ("Pulau Pinang", None),
+    # Federal territories
+    "KL": ("Kuala Lumpur", "Kuala Lumpur"),
+    "WP Kuala Lumpur": ("Kuala Lumpur", "Kuala Lumpur"),
+    "WP Labuan": ("Labuan", "Labuan"),
+    "WP Putrajaya": ("Putrajaya", "Putrajaya"),
+    # Towns and cities
+    "JB": ("Johor", "Johor Bahru"),
+    "Johor Baru": ("Johor", "Johor Bahru"),
+    "Iskandar Puteri": ("Johor", "Johor Bahru"),
+    "Pasir Gudang": ("Johor", "Johor Bahru"),
+    "PJ": ("Selangor", "Petaling"),
+    "Petaling Jaya": ("Selangor", "Petaling"),
+    "Shah Alam": ("Selangor", "Petaling"),
+    "Subang Jaya": ("Selangor", "Petaling"),
+    "Puchong": ("Selangor", "Petaling"),
+    "Kajang": ("Selangor", "Hulu Langat"),
+    "Bangi": ("Selangor", "Hulu Langat"),
+    "Ampang": ("Selangor", "Hulu Langat"),
+    "Rawang": ("Selangor", "Gombak"),
+    "Selayang": ("Selangor", "Gombak"),
+    "Cyberjaya": ("Selangor", "Sepang"),
+    "Port Klang": ("Selangor", "Klang"),
+    "George Town": ("Pulau Pinang", "Timur Laut"),
+    "Georgetown": ("Pulau Pinang", "Timur Laut"),
+    "Bayan Lepas": ("Pulau Pinang", "Barat Daya"),
+    "Butterworth": ("Pulau Pinang", "Seberang Perai Utara"),
+    "Bukit Mertajam": ("Pulau Pinang", "Seberang Perai Tengah"),
+    "Ipoh": ("Perak", "Kinta"),
+    "Taiping": ("Perak", "Larut Matang dan Selama"),
+    "Teluk Intan": ("Perak", "Hilir Perak"),
+    "Sitiawan": ("Perak", "Manjung"),
+    "Lumut": ("Perak", "Manjung"),
+    "Alor Setar": ("Kedah", "Kota Setar"),
+    "Alor Star": ("Kedah", "Kota Setar"),
+    "Sungai Petani": ("Kedah", "Kuala Muda"),
+    "Kota Baru": ("Kelantan", "Kota Bharu"),
+    "Bandar Melaka": ("Melaka", "Melaka Tengah"),
+    "Nilai": ("Negeri Sembilan", "Seremban"),
+}
+
+
+def _fold(name: Optional[str]) -> str:
+    return " ".join((name or "").split()).casefold()
+
+
+def _build_state_index() -> Mapping[str, str]:
+    index = {_fold(alias): state for alias, (state, _) in LOCATION_ALIASES.items()}
+    # Exact state names win over aliases
+    index.update({_fold(state): state for state in MALAYSIA_DISTRICTS})
+    return MappingProxyType(index)
+
+
+def _build_district_index() -> Mapping[str, Mapping[str, str]]:
+    index: Dict[str, Dict[str, str]] = {
+        state: {_fold(d): d for d in districts} for state, districts in MALAYSIA_DISTRICTS.items()
+    }
+    for alias, (state, district) in LOCATION_ALIASES.items():
+        if district:
+            index[state].setdefault(_fold(alias), district)
+    return MappingProxyType({state: MappingProxyType(ds) for state, ds in index.items()})
+
+
+def _build_district_states() -> Mapping[str, Tuple[Tuple[str, str], ...]]:
+    """Folded district (or district alias) -> ((state, district), ...); more than one
+    entry means the district name is ambiguous. "Penang" and "Pulau Pinang" list the
+    same districts and count as one state here.
+    """
+    index: Dict[str, List[Tuple[str, str]]] = {}
+    for state, districts in _DISTRICTS_BY_STATE.items():
+        owner = "Pulau Pinang" if state == "Penang" else state
+        for folded, district in districts.items():
+            entries = index.setdefault(folded, [])
+            if (owner, district) not in entries:
+                entries.append((owner, district))
+    return MappingProxyType({k: tuple(v) for k, v in index.items()})
+
+
+# Immutable lookup tables, built once at import
+_STATE_BY_NAME = _build_state_index()
+_DISTRICTS_BY_STATE = _build_district_index()
+_STATES_BY_DISTRICT = _build_district_states()
+_DISTRICT_BY_STATE_ALIAS = MappingProxyType(
+    {_fold(alias): district for alias, (_, district) in LOCATION_ALIASES.items() if district}
+)
+
+
+def is_ambiguous_district(district: Optional[str]) -> bool:
+    return len(_STATES_BY_DISTRICT.get(_fold(district), ())) > 1
+
 
 def normalize_location(state: Optional[str], district: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Map free-form state/district names (any case, common aliases such as KL, JB,
+    Penang) to official names. A district alone infers its state when unambiguous.
+    """
     if not state and not district:
         return None, None
 
-    # Normalize state by case-insensitive match
-    normalized_state = None
-    for s in MALAYSIA_DISTRICTS.keys():
-        if state and s.lower() == state.lower():
-            normalized_state = s
-            break
-    # Allow Penang/Pulau Pinang equivalence
-    if not normalized_state and state:
-        if state.lower() == "penang":
-            normalized_state = "Pulau Pinang"
-        elif state.lower() == "pulau pinang":
-            normalized_state = "Pulau Pinang"
+    normalized_state = _STATE_BY_NAME.get(_fold(state)) if state else None
 
     normalized_district = None
     if normalized_state and district:
-        for d in MALAYSIA_DISTRICTS[normalized_state]:
-            if d.lower() == district.lower():
-                normalized_district = d
-                break
+        normalized_district = _DISTRICTS_BY_STATE[normalized_state].get(_fold(district))
+    elif normalized_state and state:
+        # A town alias given as the state (e.g. "KL", "JB") also implies its district
+        normalized_district = _DISTRICT_BY_STATE_ALIAS.get(_fold(state))
 
     # If only district known, try to infer state by unique district occurrence
     if not normalized_state and district:
-        candidates = [
-            s for s, ds in MALAYSIA_DISTRICTS.items() if any(d.lower() == district.lower() for d in ds)
-        ]
+        candidates = _STATES_BY_DISTRICT.get(_fold(district), ())
         if len(candidates) == 1:
-            normalized_state = candidates[0]
-            for d in MALAYSIA_DISTRICTS[normalized_state]:
-                if d.lower() == district.lower():
-                    normalized_district = d
-                    break
+            normalized_state, normalized_district = candidates[0]
 
     return normalized_state, normalized_district
-
-
@@ -2,8 +2,12 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
+from app.llm.openrouter_client import close_llm_client
+from app.llm.preclassifier import load_preclassifier
 from app.logging_config import setup_logging
+from app.routes.feeds import router as feeds_router
 from app.routes.keywords import router as keywords_router
+from app.routes.llm import router as llm_router
 from app.routes.mentions import router as mentions_router
 from app.routes.scraping import router as scraping_router
 from app.scheduler import start_scheduler, shutdown_scheduler
@@ -26,6 +30,8 @@ app.add_middleware(
 app.include_router(keywords_router)
 app.include_router(mentions_router)
 app.include_router(scraping_router)
+app.include_router(feeds_router)
+app.include_router(llm_router)
 
 
 @app.get("/")
@@ -35,11 +41,13 @@ def root():
 
 @app.on_event("startup")
 def on_startup():
+    load_preclassifier()
     start_scheduler()
 
 
 @app.on_event("shutdown")
 def on_shutdown():
     shutdown_scheduler()
+    close_llm_client()
 
 
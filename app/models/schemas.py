@@ -47,3 +47,16 @@ class StatusUpdate(BaseModel):
     status: str
 
 
+
+
+class FeedCreate(BaseModel):
+    url: str = Field(min_length=8)
+    interval_override_minutes: Optional[int] = Field(default=None, ge=1)
+
+
+class FeedUpdate(BaseModel):
+    enabled: Optional[bool] = None
+    # Set to pin a fixed polling interval; null returns the feed to adaptive polling
+    interval_override_minutes: Optional[int] = Field(default=None, ge=1)
+    # Poll on the next scheduler tick
+    poll_now: bool = False
@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, HTTPException
+
+from app.db.supabase_client import add_feeds, delete_feed, list_feeds, update_feed
+from app.models.schemas import FeedCreate, FeedUpdate
+from app.scrapers.feed_registry import seed_feeds
+
+
+router = APIRouter(prefix="/feeds", tags=["feeds"])
+
+
+@router.get("")
+def get_feeds(enabled_only: bool = False):
+    try:
+        seed_feeds()
+        return list_feeds(enabled_only=enabled_only)
+    except Exception as exc:  # noqa: BLE001
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
+@router.post("")
+def create_feed(payload: FeedCreate):
+    try:
+        entry = {"url": payload.url.strip(), "enabled": True}
+        if payload.interval_override_minutes:
+            entry["interval_override_minutes"] = payload.interval_override_minutes
+        inserted = add_feeds([entry])
+    except Exception as exc:  # noqa: BLE001
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if not inserted:
+        raise HTTPException(status_code=409, detail="Feed already exists")
+    return inserted[0]
+
+
+@router.patch("/{feed_id}")
+def patch_feed(feed_id: str, payload: FeedUpdate):
+    fields = payload.model_dump(exclude_unset=True)
+    if fields.pop("poll_now", False):
+        fields["next_poll_at"] = datetime.now(timezone.utc).isoformat()
+    if not fields:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+    try:
+        return update_feed(feed_id, fields)
+    except Exception as exc:  # noqa: BLE001
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@router.delete("/{feed_id}")
+def remove_feed(feed_id: str):
+    try:
+        return delete_feed(feed_id)
+    except Exception as exc:  # noqa: BLE001
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
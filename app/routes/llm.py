@@ -0,0 +1,24 @@
+from fastapi import APIRouter
+
+from app.llm.adaptive_batch import batching_metrics
+from app.llm.cache import get_llm_cache
+from app.llm.call_policy import call_policy_metrics
+from app.llm.openrouter_client import llm_queue_metrics
+from app.llm.preclassifier import preclassifier_metrics
+from app.llm.prompt_builder import prompt_savings
+
+
+router = APIRouter(prefix="/llm", tags=["llm"])
+
+
+@router.get("/metrics")
+def llm_metrics():
+    cache = get_llm_cache()
+    return {
+        "cache": cache.stats() if cache else None,
+        "preclassifier": preclassifier_metrics(),
+        "calls": call_policy_metrics(),
+        "queue": llm_queue_metrics(),
+        "prompts": prompt_savings(),
+        "batching": batching_metrics(),
+    }
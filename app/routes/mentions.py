@@ -2,17 +2,21 @@ from typing import Optional
 
 from fastapi import APIRouter, HTTPException, Query
 
+from app.config import MentionCountMode, get_settings
 from app.db.supabase_client import (
     list_mentions,
     update_mention_status,
 )
+from app.llm.priority import INTERACTIVE, llm_priority
 from app.models.schemas import StatusUpdate
 from app.services.cleanup_service import clean_mentions_with_llm
 from app.services.faker_service import generate_fake_mentions
-from app.db.supabase_client import upsert_mention
+from app.db.supabase_client import bulk_upsert_mentions
 
 router = APIRouter(prefix="/health-mentions", tags=["health-mentions"])
 
+MAX_PAGE_SIZE = 100
+
 
 @router.get("")
 def get_health_mentions(
@@ -23,22 +27,47 @@ def get_health_mentions(
     keywords: Optional[str] = Query(
         default=None, description="Comma-separated keyword list"
     ),
-    page: int = 1,
-    page_size: int = 20,
+    page: int = Query(default=1, ge=1),
+    page_size: int = Query(default=20, ge=1, le=MAX_PAGE_SIZE),
+    count: Optional[MentionCountMode] = Query(
+        default=None,
+        description="How `total` is computed: exact, planned (planner estimate), estimated"
+        " (exact for small results, planned for large) or none (total is null)."
+        " Defaults to MENTIONS_COUNT_MODE, or none when a cursor is given.",
+    ),
+    cursor: Optional[str] = Query(
+        default=None,
+        description="`next_cursor` of the previous page; replaces `page` with keyset paging",
+    ),
 ):
     keyword_list = (
         [k.strip() for k in keywords.split(",") if k.strip()] if keywords else None
     )
-    items, total = list_mentions(
-        start_date=start_date,
-        end_date=end_date,
-        data_source=data_source,
-        status=status,
-        keywords=keyword_list,
-        page=page,
-        page_size=page_size,
-    )
-    return {"items": items, "page": page, "page_size": page_size, "total": total}
+    # Later cursor pages usually do not need the total again
+    count_mode = count or ("none" if cursor else get_settings().mentions_count_mode)
+    try:
+        items, total, next_cursor = list_mentions(
+            start_date=start_date,
+            end_date=end_date,
+            data_source=data_source,
+            status=status,
+            keywords=keyword_list,
+            page=page,
+            page_size=page_size,
+            count=count_mode,
+            cursor=cursor,
+        )
+    except ValueError as exc:
+        # Malformed or tampered cursor
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {
+        "items": items,
+        "page": None if cursor else page,
+        "page_size": page_size,
+        "total": total,
+        "count": count_mode,
+        "next_cursor": next_cursor,
+    }
 
 
 @router.put("/{mention_id}/status")
@@ -52,7 +81,9 @@ def put_health_mention_status(mention_id: str, payload: StatusUpdate):
 @router.post("/clean-metadata")
 def run_clean_metadata(limit: int = 50):
     try:
-        result = clean_mentions_with_llm(limit=limit)
+        # Analyst-triggered: ahead of scheduled scraping in the LLM queue
+        with llm_priority(INTERACTIVE):
+            result = clean_mentions_with_llm(limit=limit)
         return result
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(status_code=500, detail=str(exc)) from exc
@@ -64,14 +95,16 @@ def create_fake_mentions(count: int = 5):
         from app.db.supabase_client import list_keywords as _lk
 
         allowed = [k["keyword"] for k in _lk()]
-        items = generate_fake_mentions(count, allowed)
-        inserted = []
-        for it in items:
-            try:
-                inserted.append(upsert_mention(it))
-            except Exception:
-                continue
-        return {"generated": len(items), "inserted": len(inserted), "items": inserted}
+        with llm_priority(INTERACTIVE):
+            items = generate_fake_mentions(count, allowed)
+        written = bulk_upsert_mentions(items) if items else {"inserted": [], "existing": [], "failed": []}
+        return {
+            "generated": len(items),
+            "inserted": len(written["inserted"]),
+            "duplicates": len(written["existing"]),
+            "failed": len(written["failed"]),
+            "items": written["inserted"],
+        }
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
@@ -1,97 +1,333 @@
+import contextvars
 import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import List
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 
-from app.config import get_settings
-from app.db.supabase_client import list_keywords, upsert_mention
-from app.scrapers.rss_scraper import fetch_rss_entries, infer_outlet_from_link
+from app.config import EnrichmentMode, get_settings
+from app.db.seen_links import get_seen_link_index
+from app.db.supabase_client import bulk_upsert_mentions, list_keywords
+from app.scrapers.feed_cache import get_feed_validator_store
+from app.scrapers.feed_registry import due_feeds, load_feeds, record_poll
+from app.scrapers.rss_scraper import (
+    commit_feed_validators,
+    fetch_feeds_concurrently,
+    infer_outlet_from_link,
+)
+from app.scrapers.url_canonical import dedupe_key
+from app.utils.keyword_matcher import KeywordMatcher, get_keyword_matcher
 from app.services.exa_service import search_recent_mentions, enrich_with_exa_contents
+from app.llm.batching import track_fallbacks
+from app.llm.enrichment import enrich_batch
 from app.llm.health_classifier import classify_batch
-from app.llm.summarizer import summarize_batch
+from app.llm.summarizer import summarize_with_policy
+from app.utils.extractive_summary import extractive_summary
 from app.scrapers.location_extractor import extract_location
-from app.llm.location_llm import extract_location_with_llm
+from app.llm.location_llm import resolve_locations
 
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["scraping"])
 
 
-@router.post("/scrape-news")
-def scrape_news():
+def _drop_duplicates(entries: List[dict], run_keys: Set[str]) -> List[dict]:
+    """Keep the first entry per canonical link across all feeds of this run."""
+    unique: List[dict] = []
+    for entry in entries:
+        key = dedupe_key(entry.get("link"))
+        if key and key in run_keys:
+            continue
+        if key:
+            run_keys.add(key)
+        unique.append(entry)
+    return unique
+
+
+# Entries removed by each pipeline stage, in pipeline order
+STAGE_KEYS = ("skipped_seen", "duplicates", "no_keyword", "not_health", "failed")
+
+
+def _match_keywords(item: dict, matcher: KeywordMatcher) -> List[str]:
+    return matcher.matches(" ".join([item.get("title") or "", item.get("summary") or ""]))
+
+
+def _item_text(item: dict) -> str:
+    return " ".join([item.get("title") or "", item.get("summary") or ""])
+
+
+def _summary_priority(item: dict, matcher: KeywordMatcher) -> str:
+    """Items naming a keyword in the headline are "high" priority for the tiered summary policy."""
+    return "high" if matcher.matches(item.get("title") or "") else "low"
+
+
+def _summarize_and_locate(
+    health_items: List[Tuple[dict, List[str]]], active_keywords: List[str]
+) -> List[Tuple[dict, List[str], str, Optional[dict]]]:
+    matcher = get_keyword_matcher(active_keywords)
+    summaries = summarize_with_policy(
+        [
+            {
+                "title": item.get("title") or "",
+                "text": _item_text(item),
+                "body": item.get("summary") or "",
+                "priority": _summary_priority(item, matcher),
+            }
+            for item, _ in health_items
+        ],
+        active_keywords,
+    )
+    # Gazetteer first; unresolved items share one batched LLM call
+    locations = resolve_locations(
+        [{"title": item.get("title") or "", "text": item.get("summary") or ""} for item, _ in health_items]
+    )
+    return [
+        (item, matched_keywords, llm_summary, location)
+        for (item, matched_keywords), llm_summary, location in zip(health_items, summaries, locations)
+    ]
+
+
+def _enrich_separate(
+    candidates: List[Tuple[dict, List[str]]], active_keywords: List[str]
+) -> List[Tuple[dict, List[str], str, Optional[dict]]]:
+    """Classify, then summarize (under `summary_policy`) and locate health items with
+    separate calls. Returns (item, keywords, summary, location) for health-related items only.
+
+    Classification streams its flags; every `llm_batch_size` health items are handed to
+    summarization and location while the remaining flags are still arriving.
+    """
+    settings = get_settings()
+    inputs = [
+        {"title": item.get("title") or "", "summary": item.get("summary") or ""}
+        for item, _ in candidates
+    ]
+    position = {id(entry): i for i, entry in enumerate(inputs)}
+    pending: List[int] = []
+    seen: Set[int] = set()
+    lock = threading.Lock()
+    futures: List[Tuple[List[int], Future]] = []
+    pool = ThreadPoolExecutor(max_workers=max(1, settings.llm_batch_concurrency), thread_name_prefix="enrich")
+
+    def _submit(indexes: List[int]) -> None:
+        batch = [candidates[i] for i in indexes]
+        # Downstream calls keep the caller's llm_priority class
+        future = pool.submit(contextvars.copy_context().run, _summarize_and_locate, batch, active_keywords)
+        futures.append((indexes, future))
+
+    def _on_flag(entry: dict, health_ok: bool) -> None:
+        if health_ok is not True:
+            return
+        index = position[id(entry)]
+        with lock:
+            if index in seen:
+                return
+            seen.add(index)
+            pending.append(index)
+            if len(pending) < settings.llm_batch_size:
+                return
+            ready = pending[:]
+            pending.clear()
+            _submit(ready)
+
+    try:
+        classify_batch(inputs, on_result=_on_flag)
+        with lock:
+            if pending:
+                _submit(pending[:])
+                pending.clear()
+        enriched: Dict[int, Tuple[dict, List[str], str, Optional[dict]]] = {}
+        for indexes, future in futures:
+            enriched.update(zip(indexes, future.result()))
+    finally:
+        pool.shutdown(wait=True)
+    # Candidate order, as before the pipelining
+    return [enriched[i] for i in sorted(enriched)]
+
+
+def _enrich_fused(candidates: List[Tuple[dict, List[str]]]) -> List[Tuple[dict, List[str], str, Optional[dict]]]:
+    """One structured LLM call per chunk for health flag, summary and location.
+    Rule-based locations still take precedence over the model's.
+    """
+    results = enrich_batch(
+        [{"title": item.get("title") or "", "text": _item_text(item)} for item, _ in candidates]
+    )
+    return [
+        (item, matched_keywords, result["summary"], extract_location(_item_text(item)) or result["location"])
+        for (item, matched_keywords), result in zip(candidates, results)
+        if result["is_health"] is True
+    ]
+
+
+def _process_feed_entries(
+    entries: Iterable[dict],
+    active_keywords: List[str],
+    stats: Dict[str, int],
+    run_keys: Set[str],
+    enrichment_mode: EnrichmentMode = "separate",
+) -> Tuple[List[dict], int]:
+    """Filter, classify, summarize, locate and store one feed's entries (consumed once,
+    as they are parsed). Returns the inserted rows and the number of entries read.
+    The count each stage removes is added to `stats` (see STAGE_KEYS); `run_keys`
+    holds the links already taken this run. `enrichment_mode` "fused" replaces the
+    separate classify/summarize/locate calls with one enrich_batch call.
+    """
+    # Drop links already stored before paying for any LLM work; only fresh entries are kept
+    seen_index = get_seen_link_index()
+    total = 0
+    fresh: List[dict] = []
+    for e in entries:
+        total += 1
+        if e.get("link") not in seen_index and e.get("source_link") not in seen_index:
+            fresh.append(e)
+    stats["skipped_seen"] += total - len(fresh)
+    unique = _drop_duplicates(fresh, run_keys)
+    stats["duplicates"] += len(fresh) - len(unique)
+
+    # Keyword prefilter: only entries mentioning an active keyword reach the LLM stages
+    matcher = get_keyword_matcher(active_keywords)
+    candidates = []
+    for item in unique:
+        matched_keywords = _match_keywords(item, matcher)
+        if matched_keywords:
+            candidates.append((item, matched_keywords))
+    stats["no_keyword"] += len(unique) - len(candidates)
+    if not candidates:
+        return [], total
+
+    if enrichment_mode == "fused":
+        enriched = _enrich_fused(candidates)
+    else:
+        enriched = _enrich_separate(candidates, active_keywords)
+    stats["not_health"] += len(candidates) - len(enriched)
+
+    records: List[dict] = []
+    for item, matched_keywords, llm_summary, location in enriched:
+        # Map scraped item to DB schema
+        date_value = (
+            item.get("published_date") or datetime.utcnow().date().isoformat()
+        )
+
+        record = {
+            "date": date_value,
+            "data_source": "News Outlet",
+            "headline": item.get("title") or "",
+            "summary": llm_summary
+            or extractive_summary(item.get("summary") or "", title=item.get("title") or "", keywords=active_keywords),
+            "image_url": item.get("image_url"),
+            "link": item.get("link"),
+            "media_type": "news article",
+            "media_outlet": item.get("outlet"),
+            "media_name": item.get("outlet"),
+            "status": "unverified",
+            "keywords": matched_keywords,
+            "engagement": 0,
+            "location": location,
+        }
+        records.append(record)
+    if not records:
+        return [], total
+    # One bulk request per feed; links stored meanwhile (e.g. by another run) count as duplicates
+    try:
+        written = bulk_upsert_mentions(records)
+    except Exception as exc:  # noqa: BLE001
+        stats["failed"] += len(records)
+        logger.warning("Failed to store %d mentions: %s", len(records), exc)
+        return [], total
+    stats["duplicates"] += len(written["existing"])
+    stats["failed"] += len(written["failed"])
+    return written["inserted"], total
+
+
+def _run_scrape(feeds: List[dict]) -> dict:
+    """Scrape the given registry feeds and record each poll in the registry."""
     settings = get_settings()
     active_keywords = [k["keyword"] for k in list_keywords()]
     if not active_keywords:
         return {"message": "No active keywords configured"}
 
-    inserted: List[dict] = []
-    for feed_url in settings.rss_feeds:
-        entries = fetch_rss_entries(feed_url)
-        # Batch classify health relevance to reduce LLM calls
-        batch_payload = [
-            {"title": e.get("title") or "", "summary": e.get("summary") or ""}
-            for e in entries
-        ]
-        batch_flags = classify_batch(batch_payload)
-        # Prepare texts for summarization in parallel
-        summaries = summarize_batch(
-            [
-                {
-                    "title": e.get("title") or "",
-                    "text": " ".join([e.get("title") or "", e.get("summary") or ""]),
-                }
-                for e in entries
-            ]
+    feeds_by_url = {feed["url"]: feed for feed in feeds}
+    validator_store = get_feed_validator_store() if settings.rss_conditional_get else None
+    get_seen_link_index().ensure_warm()
+    stages: Dict[str, int] = dict.fromkeys(STAGE_KEYS, 0)
+    run_keys: Set[str] = set()
+    fetched_total = 0
+    inserted_total = 0
+    feed_reports: List[dict] = []
+    # Feeds are fetched concurrently and processed in completion order
+    for result in fetch_feeds_concurrently(
+        list(feeds_by_url),
+        max_workers=settings.rss_fetch_concurrency,
+        timeout=settings.rss_fetch_timeout_seconds,
+        per_host_limit=settings.rss_per_host_concurrency,
+        validator_store=validator_store,
+        fast_parser=settings.rss_fast_parser,
+    ):
+        started = time.perf_counter()
+        # Unchanged / 304 feeds carry no entries and skip every LLM stage
+        feed_stages: Dict[str, int] = dict.fromkeys(STAGE_KEYS, 0)
+        with track_fallbacks() as fallbacks:
+            inserted, entry_count = _process_feed_entries(
+                result["entries"], active_keywords, feed_stages, run_keys,
+                enrichment_mode=settings.llm_enrichment_mode,
+            )
+        if validator_store is not None:
+            if feed_stages["failed"] == 0 and fallbacks.items == 0:
+                commit_feed_validators(result, validator_store)
+            else:
+                # Keep the old validators so the next poll fetches and processes the feed again
+                logger.info(
+                    "Feed %s: keeping previous validators (%d failed writes, %d LLM fallbacks)",
+                    result["feed_url"], feed_stages["failed"], fallbacks.items,
+                )
+        report = {
+            "feed_url": result["feed_url"],
+            "status": result["status"],
+            "entries": entry_count,
+            # Entries not stored before and not repeated from another feed of this run
+            "new_entries": entry_count - feed_stages["skipped_seen"] - feed_stages["duplicates"],
+            "inserted": len(inserted),
+            "llm_fallbacks": fallbacks.items,
+            "stages": feed_stages,
+            "fetch_ms": result["fetch_ms"],
+            "process_ms": int((time.perf_counter() - started) * 1000),
+            "error": result["error"],
+        }
+        logger.info(
+            "Feed %s: %s, %d entries, %d inserted, stages %s (fetch %dms, process %dms)",
+            report["feed_url"], report["status"], report["entries"], report["inserted"],
+            feed_stages, report["fetch_ms"], report["process_ms"],
         )
+        record_poll(feeds_by_url[result["feed_url"]], report)
+        feed_reports.append(report)
+        for key, value in feed_stages.items():
+            stages[key] += value
+        fetched_total += entry_count
+        inserted_total += len(inserted)
 
-        for (item, health_ok, llm_summary) in zip(entries, batch_flags, summaries):
-            text_for_match = " ".join(
-                [
-                    item.get("title") or "",
-                    item.get("summary") or "",
-                ]
-            ).lower()
-            matched_keywords = [
-                keyword for keyword in active_keywords if keyword.lower() in text_for_match
-            ]
-            if matched_keywords and health_ok is True:
-                # Map scraped item to DB schema
-                date_value = (
-                    item.get("published_date") or datetime.utcnow().date().isoformat()
-                )
+    return {
+        "message": "scrape completed",
+        "fetched": fetched_total,
+        "inserted": inserted_total,
+        "stages": stages,
+        "feeds": feed_reports,
+    }
+
+
+@router.post("/scrape-news")
+def scrape_news():
+    """Scrape every enabled registry feed now, regardless of its schedule."""
+    return _run_scrape(load_feeds())
 
-                # Extract location from title + summary
-                location = extract_location(
-                    " ".join([item.get("title") or "", item.get("summary") or ""])
-                )
-                if not location:
-                    location = extract_location_with_llm(
-                        item.get("title") or "", item.get("summary") or ""
-                    )
-
-                record = {
-                    "date": date_value,
-                    "data_source": "News Outlet",
-                    "headline": item.get("title") or "",
-                    "summary": llm_summary or item.get("summary"),
-                    "image_url": item.get("image_url"),
-                    "link": item.get("link"),
-                    "media_type": "news article",
-                    "media_outlet": item.get("outlet"),
-                    "media_name": item.get("outlet"),
-                    "status": "unverified",
-                    "keywords": matched_keywords,
-                    "engagement": 0,
-                    "location": location,
-                }
-                try:
-                    inserted_item = upsert_mention(record)
-                    inserted.append(inserted_item)
-                except Exception as exc:  # noqa: BLE001
-                    logger.warning("Failed to upsert %s: %s", record.get("link"), exc)
-
-    return {"message": "scrape completed", "inserted": len(inserted)}
+
+def scrape_due_feeds() -> dict:
+    """Scrape only the feeds whose adaptive polling interval has elapsed."""
+    feeds = due_feeds(load_feeds())
+    if not feeds:
+        return {"message": "no feeds due", "inserted": 0}
+    return _run_scrape(feeds)
 
 
 
@@ -102,8 +338,25 @@ def ingest_exa(max_results: int = 10, include_social: bool = True):
     if not active_keywords:
         return {"message": "no active keywords"}
     results = search_recent_mentions(active_keywords, max_results=max_results, include_social=include_social)
-    inserted = 0
     enriched = enrich_with_exa_contents(results)
+    enriched_by_link = {e.get("link"): e for e in enriched}
+    # Results the enrichment could not place get one more batched attempt on title + summary
+    unplaced = [item for item in results if not enriched_by_link.get(item.get("url"), {}).get("location")]
+    fallback_locations = dict(
+        zip(
+            [item.get("url") for item in unplaced],
+            resolve_locations(
+                [
+                    {
+                        "title": item.get("title") or "",
+                        "text": enriched_by_link.get(item.get("url"), {}).get("summary") or "",
+                    }
+                    for item in unplaced
+                ]
+            ),
+        )
+    )
+    records: List[dict] = []
     for idx, item in enumerate(results):
         title = item.get("title")
         url = item.get("url")
@@ -118,11 +371,9 @@ def ingest_exa(max_results: int = 10, include_social: bool = True):
             date_value = datetime.utcnow().date().isoformat()
 
         # pre-enriched fields
-        pre = next((e for e in enriched if e.get("link") == url), {})
+        pre = enriched_by_link.get(url, {})
         # location extraction (prefer enriched)
-        location = pre.get("location")
-        if not location:
-            location = extract_location(title or "") or extract_location_with_llm(title or "", pre.get("summary") or "")
+        location = pre.get("location") or fallback_locations.get(url)
         # final fallback to general Malaysia when no location resolved
         if not location:
             location = {"state": "Malaysia", "district": None}
@@ -142,12 +393,21 @@ def ingest_exa(max_results: int = 10, include_social: bool = True):
             "engagement": 0,
             "location": location,
         }
-        try:
-            upsert_mention(record)
-            inserted += 1
-        except Exception as exc:  # noqa: BLE001
-            logger.warning("Failed to upsert EXA result %s: %s", url, exc)
+        records.append(record)
 
-    return {"message": "exa ingestion completed", "inserted": inserted, "fetched": len(results)}
+    try:
+        written = bulk_upsert_mentions(records) if records else {"inserted": [], "existing": [], "failed": []}
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Failed to store %d EXA results: %s", len(records), exc)
+        raise HTTPException(status_code=500, detail=f"Failed to store {len(records)} EXA results: {exc}") from exc
+    if written["failed"]:
+        logger.warning("Failed to store %d of %d EXA results", len(written["failed"]), len(records))
+    return {
+        "message": "exa ingestion completed",
+        "fetched": len(results),
+        "inserted": len(written["inserted"]),
+        "duplicates": len(written["existing"]),
+        "failed": len(written["failed"]),
+    }
 
 
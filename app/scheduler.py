@@ -4,7 +4,9 @@ from typing import Optional
 
 from apscheduler.schedulers.background import BackgroundScheduler
 
-from app.routes.scraping import scrape_news
+from app.config import get_settings
+from app.llm.priority import BACKGROUND, llm_priority
+from app.routes.scraping import scrape_due_feeds
 
 
 logger = logging.getLogger(__name__)
@@ -18,10 +20,14 @@ def start_scheduler() -> None:
         return
     if _scheduler is not None:
         return
+    tick = get_settings().feed_scheduler_tick_minutes
     _scheduler = BackgroundScheduler()
-    _scheduler.add_job(_run_scrape_job, "interval", minutes=30, id="rss_scrape_job")
+    # Each tick polls only the feeds that are due under their adaptive interval
+    _scheduler.add_job(
+        _run_scrape_job, "interval", minutes=tick, id="rss_scrape_job", max_instances=1, coalesce=True
+    )
     _scheduler.start()
-    logger.info("Scheduler started with job 'rss_scrape_job' (every 30 minutes)")
+    logger.info("Scheduler started with job 'rss_scrape_job' (due-feed check every %d minutes)", tick)
 
 
 def shutdown_scheduler() -> None:
@@ -34,7 +40,9 @@ def shutdown_scheduler() -> None:
 
 def _run_scrape_job() -> None:
     try:
-        result = scrape_news()
+        # Scheduled work yields the LLM queue to interactive and ingest requests
+        with llm_priority(BACKGROUND):
+            result = scrape_due_feeds()
         logger.info("Scheduled scrape result: %s", result)
     except Exception as exc:  # noqa: BLE001
         logger.exception("Scheduled scrape failed: %s", exc)
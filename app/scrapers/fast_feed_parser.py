@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+from email.utils import parsedate_to_datetime
+from io import BytesIO
+from typing import Dict, Iterator, List, Optional
+import xml.etree.ElementTree as ET
+
+
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+MEDIA_NS = "{http://search.yahoo.com/mrss/}"
+DC_NS = "{http://purl.org/dc/elements/1.1/}"
+RSS1_NS = "{http://purl.org/rss/1.0/}"
+
+_ITEM_TAGS = {"item", f"{RSS1_NS}item", f"{ATOM_NS}entry"}
+_ROOT_TAGS = {"rss", "{http://www.w3.org/1999/02/22-rdf-syntax-ns#}RDF", f"{ATOM_NS}feed"}
+
+
+class UnsupportedFeed(ValueError):
+    """Raised when the body is not RSS 2.0, RSS 1.0 or Atom."""
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _text(elem: Optional[ET.Element]) -> Optional[str]:
+    if elem is None:
+        return None
+    text = "".join(elem.itertext()).strip()
+    return text or None
+
+
+def _iso_date(value: Optional[str]) -> Optional[str]:
+    """UTC calendar date of an RFC 822 or ISO 8601 timestamp."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return date(parsed.year, parsed.month, parsed.day).isoformat()
+
+
+def _entry_from_element(item: ET.Element) -> Dict[str, Optional[str]]:
+    title = summary = content = link = published = updated = guid_link = None
+    thumbnail = media_content = None
+    for child in item:
+        tag = child.tag
+        name = _local(tag)
+        if name == "title" and title is None:
+            title = _text(child)
+        elif name in {"description", "summary"} and summary is None and not tag.startswith(MEDIA_NS):
+            summary = _text(child)
+        elif tag == f"{ATOM_NS}content" and content is None:
+            content = _text(child)
+        elif name == "link" and tag.startswith(ATOM_NS):
+            if link is None and child.get("rel", "alternate") == "alternate":
+                link = child.get("href")
+        elif name == "link" and link is None:
+            link = _text(child)
+        elif name == "guid" and child.get("isPermaLink", "true") == "true":
+            guid_link = _text(child)
+        elif name in {"pubDate", "published", "issued"} and published is None:
+            published = _text(child)
+        elif (name == "updated" or tag == f"{DC_NS}date") and updated is None:
+            updated = _text(child)
+        elif tag == f"{MEDIA_NS}thumbnail" and thumbnail is None:
+            thumbnail = child.get("url")
+        elif tag == f"{MEDIA_NS}content" and media_content is None:
+            media_content = child.get("url")
+        elif tag == f"{MEDIA_NS}group" and thumbnail is None:
+            nested = child.find(f"{MEDIA_NS}thumbnail")
+            thumbnail = nested.get("url") if nested is not None else None
+    if link is None and guid_link and guid_link.startswith("http"):
+        link = guid_link
+    return {
+        "title": title,
+        "summary": summary or content,
+        "link": link,
+        "published_date": _iso_date(published) or _iso_date(updated),
+        "image_url": thumbnail or media_content,
+    }
+
+
+def iter_fast_entries(body: bytes) -> Iterator[Dict[str, Optional[str]]]:
+    """Incrementally parse an RSS 2.0 / RSS 1.0 / Atom body, yielding one entry dict
+    (title, summary, link, published_date, image_url) per item and discarding each
+    item's elements once yielded. Raises ET.ParseError or UnsupportedFeed; summaries
+    are returned as-is, without feedparser's HTML sanitizing.
+    """
+    stack: List[ET.Element] = []
+    for event, elem in ET.iterparse(BytesIO(body), events=("start", "end")):
+        if event == "start":
+            if not stack and elem.tag not in _ROOT_TAGS:
+                raise UnsupportedFeed(f"unsupported feed root <{_local(elem.tag)}>")
+            stack.append(elem)
+            continue
+        stack.pop()
+        if elem.tag in _ITEM_TAGS:
+            yield _entry_from_element(elem)
+            # Drop the finished item so memory stays flat on large feeds
+            if stack:
+                stack[-1].remove(elem)
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from typing import Dict, Optional
+from datetime import datetime
+import json
+import logging
+import os
+import threading
+
+from app.config import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class FeedValidatorStore:
+    """Per-feed HTTP validators (ETag, Last-Modified) and body hash, persisted as JSON."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, Optional[str]]] = {}
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                loaded = json.load(fh)
+            if isinstance(loaded, dict):
+                self._data = loaded
+        except FileNotFoundError:
+            pass
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Ignoring unreadable feed validator store %s: %s", path, exc)
+
+    def get(self, feed_url: str) -> Dict[str, Optional[str]]:
+        with self._lock:
+            return dict(self._data.get(feed_url) or {})
+
+    def update(
+        self,
+        feed_url: str,
+        *,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        content_hash: Optional[str],
+    ) -> None:
+        with self._lock:
+            self._data[feed_url] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "content_hash": content_hash,
+                "updated_at": datetime.utcnow().replace(microsecond=0).isoformat(),
+            }
+            self._save()
+
+    def _save(self) -> None:
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump(self._data, fh)
+            os.replace(tmp_path, self.path)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Failed to persist feed validators to %s: %s", self.path, exc)
+
+
+_store: Optional[FeedValidatorStore] = None
+_store_lock = threading.Lock()
+
+
+def get_feed_validator_store() -> FeedValidatorStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FeedValidatorStore(get_settings().rss_cache_path)
+        return _store
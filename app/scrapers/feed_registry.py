@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+import logging
+import threading
+
+from app.config import Settings, get_settings
+from app.db.supabase_client import add_feeds, list_feeds, update_feed
+
+
+logger = logging.getLogger(__name__)
+
+# Weight of the latest poll in the moving averages
+EMA_ALPHA = 0.3
+# Average inserted mentions per poll above which a feed counts as high-yield
+HIGH_YIELD = 1.0
+# Average new items per poll above which a feed counts as busy / below which as quiet
+BUSY_ITEMS = 10.0
+QUIET_ITEMS = 1.0
+
+_seeded = False
+# Poll statistics and schedule of id-less fallback feeds (registry unavailable), by URL
+_unregistered: Dict[str, Dict[str, Any]] = {}
+_unregistered_lock = threading.Lock()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse_ts(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def seed_feeds(settings: Optional[Settings] = None) -> None:
+    """Register the configured `rss_feeds` once per process; existing rows are untouched."""
+    global _seeded
+    if _seeded:
+        return
+    settings = settings or get_settings()
+    entries = [
+        {"url": url, "poll_interval_minutes": settings.feed_base_interval_minutes}
+        for url in dict.fromkeys(settings.rss_feeds)
+    ]
+    inserted = add_feeds(entries)
+    if inserted:
+        logger.info("Registered %d new feeds from settings", len(inserted))
+    _seeded = True
+
+
+def load_feeds(enabled_only: bool = True) -> List[Dict[str, Any]]:
+    """Registered feeds, seeding the registry first. If the registry is unavailable
+    (e.g. the `feeds` table is missing), falls back to `rss_feeds` as id-less rows
+    carrying the statistics and `next_poll_at` recorded in this process, so they
+    keep their polling interval.
+    """
+    settings = get_settings()
+    try:
+        seed_feeds(settings)
+        return list_feeds(enabled_only=enabled_only)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Feed registry unavailable, using configured rss_feeds: %s", exc)
+        with _unregistered_lock:
+            return [
+                {**_unregistered.get(url, {}), "id": None, "url": url, "enabled": True}
+                for url in dict.fromkeys(settings.rss_feeds)
+            ]
+
+
+def due_feeds(feeds: List[Dict[str, Any]], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    now = now or _now()
+    due = []
+    for feed in feeds:
+        next_poll = _parse_ts(feed.get("next_poll_at"))
+        if next_poll is None or next_poll <= now:
+            due.append(feed)
+    return due
+
+
+def _ema(previous: Optional[float], value: float, polls: int) -> float:
+    if not polls or previous is None:
+        return float(value)
+    return (1 - EMA_ALPHA) * float(previous) + EMA_ALPHA * float(value)
+
+
+def next_interval_minutes(feed: Dict[str, Any], settings: Settings) -> int:
+    """Adaptive polling interval from a feed's (already updated) statistics:
+    errors back off exponentially, high-yield or busy feeds speed up, quiet feeds
+    slow down gradually.
+    """
+    base = settings.feed_base_interval_minutes
+    low, high = settings.feed_min_interval_minutes, settings.feed_max_interval_minutes
+    if feed.get("interval_override_minutes"):
+        return int(feed["interval_override_minutes"])
+    streak = int(feed.get("error_streak") or 0)
+    if streak:
+        return min(high, base * 2 ** min(streak, 10))
+    yield_ = float(feed.get("health_yield") or 0)
+    items = float(feed.get("avg_items_per_poll") or 0)
+    if yield_ >= HIGH_YIELD:
+        return low
+    if items >= BUSY_ITEMS or yield_ > 0:
+        return max(low, base // 2)
+    if items < QUIET_ITEMS:
+        previous = int(feed.get("poll_interval_minutes") or base)
+        return min(high, max(base, int(previous * 1.5)))
+    return base
+
+
+def record_poll(feed: Dict[str, Any], report: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Fold one scrape report (see scrape_news) into the feed's statistics and schedule
+    its next poll. The items-per-poll average counts the report's "new_entries", so a
+    feed that republishes the same items does not look busy. Returns the persisted row;
+    id-less fallback feeds are kept in memory only.
+    """
+    settings = get_settings()
+    now = now or _now()
+    polls = int(feed.get("total_polls") or 0)
+    fields: Dict[str, Any] = {
+        "last_polled_at": now.isoformat(),
+        "last_status": report.get("status"),
+        "total_polls": polls + 1,
+    }
+    if report.get("status") == "error":
+        fields["error_streak"] = int(feed.get("error_streak") or 0) + 1
+        fields["last_error"] = (report.get("error") or "")[:500]
+    else:
+        inserted = int(report.get("inserted") or 0)
+        fields.update(
+            {
+                "error_streak": 0,
+                "last_error": None,
+                "last_success_at": now.isoformat(),
+                "avg_items_per_poll": _ema(feed.get("avg_items_per_poll"), report.get("new_entries") or 0, polls),
+                "health_yield": _ema(feed.get("health_yield"), inserted, polls),
+                "total_inserted": int(feed.get("total_inserted") or 0) + inserted,
+            }
+        )
+    interval = next_interval_minutes({**feed, **fields}, settings)
+    fields["poll_interval_minutes"] = interval
+    fields["next_poll_at"] = (now + timedelta(minutes=interval)).isoformat()
+    if not feed.get("id"):
+        row = {**feed, **fields}
+        with _unregistered_lock:
+            _unregistered[feed["url"]] = row
+        return row
+    try:
+        return update_feed(feed["id"], fields)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Failed to record poll for feed %s: %s", feed.get("url"), exc)
+        return {**feed, **fields}
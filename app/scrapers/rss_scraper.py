@@ -1,10 +1,26 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from datetime import date
+from urllib.parse import urlparse
+import hashlib
+import threading
 import time
+import logging
+import xml.etree.ElementTree as ET
+
 import feedparser
+import httpx
+
+from app.scrapers.fast_feed_parser import UnsupportedFeed, iter_fast_entries
+from app.scrapers.feed_cache import FeedValidatorStore
+from app.scrapers.url_canonical import resolve_entry_link
+
 
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "ASB0-backend/0.1 (+https://github.com/tniveej/ASB0-backend)"
 
 OUTLET_BY_HOST = {
     "www.thestar.com.my": "The Star",
@@ -21,45 +37,267 @@ def infer_outlet_from_link(link: str) -> Optional[str]:
         return None
 
 
-def fetch_rss_entries(feed_url: str) -> List[Dict[str, str]]:
-    parsed = feedparser.parse(feed_url)
+def _feed_host(feed_url: str) -> str:
+    return urlparse(feed_url).netloc.lower()
+
+
+def _remaining(deadline: float) -> float:
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("feed fetch exceeded its deadline")
+    return remaining
+
+
+def _download_feed(
+    feed_url: str, deadline: float, headers: Optional[Dict[str, str]] = None
+) -> Tuple[int, bytes, Dict[str, str]]:
+    """Download a feed body, finishing by `deadline` (a time.monotonic() value): the
+    connect, the first byte and every later read get at most the time left, and the
+    transfer is abandoned once it runs past the deadline.
+    Returns (status_code, body, response headers); a 304 has an empty body.
+    """
+    chunks: List[bytes] = []
+    with httpx.stream(
+        "GET",
+        feed_url,
+        timeout=_remaining(deadline),
+        follow_redirects=True,
+        headers={"User-Agent": USER_AGENT, **(headers or {})},
+    ) as resp:
+        if resp.status_code == 304:
+            return 304, b"", dict(resp.headers)
+        resp.raise_for_status()
+        for chunk in resp.iter_bytes():
+            chunks.append(chunk)
+            _remaining(deadline)
+        return resp.status_code, b"".join(chunks), dict(resp.headers)
+
+
+def _entries_from_parsed(parsed: Any) -> List[Dict[str, str]]:
     results: List[Dict[str, str]] = []
     for entry in parsed.entries:
-        title = getattr(entry, "title", None)
-        summary = getattr(entry, "summary", None) or getattr(entry, "description", None)
-        link = getattr(entry, "link", None)
-        # Prefer structured parsed dates to derive ISO date
-        published_date = None
-        try:
-            if hasattr(entry, "published_parsed") and getattr(entry, "published_parsed"):
-                dt = datetime.fromtimestamp(time.mktime(getattr(entry, "published_parsed")))
-                published_date = dt.date().isoformat()
-            elif hasattr(entry, "updated_parsed") and getattr(entry, "updated_parsed"):
-                dt = datetime.fromtimestamp(time.mktime(getattr(entry, "updated_parsed")))
-                published_date = dt.date().isoformat()
-        except Exception:
-            published_date = None
-
-        outlet = infer_outlet_from_link(link) if link else None
+        link = entry.get("link")
+        # Prefer structured parsed dates (UTC struct_time) to derive ISO date
+        date_struct = entry.get("published_parsed") or entry.get("updated_parsed")
+        published_date = date(*date_struct[:3]).isoformat() if date_struct else None
         # image: check common RSS media fields
-        image_url = None
-        try:
-            if hasattr(entry, "media_thumbnail") and entry.media_thumbnail:
-                image_url = entry.media_thumbnail[0].get("url")
-            elif hasattr(entry, "media_content") and entry.media_content:
-                image_url = entry.media_content[0].get("url")
-        except Exception:
-            image_url = None
+        media = entry.get("media_thumbnail") or entry.get("media_content") or []
+        image_url = media[0].get("url") if media else None
         results.append(
             {
-                "title": title,
-                "summary": summary,
+                "title": entry.get("title"),
+                "summary": entry.get("summary") or entry.get("description"),
                 "link": link,
                 "published_date": published_date,
-                "outlet": outlet,
+                "outlet": infer_outlet_from_link(link) if link else None,
                 "image_url": image_url,
             }
         )
     return results
 
 
+def _entry_key(entry: Dict[str, str]) -> Optional[str]:
+    # Both parsers fall back from <link> to a permalink <guid>
+    return entry.get("link") or entry.get("title")
+
+
+def iter_feed_entries(body: bytes, fast: bool = True) -> Iterator[Dict[str, str]]:
+    """Yield entry dicts for a feed body, using the streaming parser when `fast` and
+    falling back to feedparser for feeds it cannot handle (malformed XML, HTML
+    entities, unknown formats). Entries already yielded (same link, or title when
+    there is none) are not repeated.
+    """
+    yielded: Set[str] = set()
+    if fast:
+        try:
+            for entry in iter_fast_entries(body):
+                link = entry["link"]
+                item = {
+                    "title": entry["title"],
+                    "summary": entry["summary"],
+                    "link": link,
+                    "published_date": entry["published_date"],
+                    "outlet": infer_outlet_from_link(link) if link else None,
+                    "image_url": entry["image_url"],
+                }
+                key = _entry_key(item)
+                if key:
+                    yielded.add(key)
+                yield item
+            return
+        except (ET.ParseError, UnsupportedFeed) as exc:
+            logger.debug("Fast parser fell back to feedparser after %d entries: %s", len(yielded), exc)
+    for item in _entries_from_parsed(feedparser.parse(body)):
+        # feedparser may recover a different set of entries, so match them by key, not position
+        if _entry_key(item) not in yielded:
+            yield item
+
+
+def fetch_rss_entries(feed_url: str, timeout: float = 20.0) -> Iterator[Dict[str, str]]:
+    _, body, _ = _download_feed(feed_url, time.monotonic() + timeout)
+    return iter_feed_entries(body)
+
+
+def _canonicalize_entries(entries: Iterable[Dict[str, str]]) -> Iterator[Dict[str, str]]:
+    """Strip tracking params from entry links and replace Google News links whose id
+    decodes offline with the publisher URL, as the entries are consumed. The feed's
+    original link is kept as `source_link`.
+    """
+    for entry in entries:
+        raw_link = entry.get("link")
+        entry["source_link"] = raw_link
+        entry["link"] = resolve_entry_link(raw_link)
+        if entry["link"] != raw_link and entry["link"]:
+            entry["outlet"] = infer_outlet_from_link(entry["link"])
+        yield entry
+
+
+def _guarded_entries(result: Dict[str, Any], entries: Iterable[Dict[str, str]]) -> Iterator[Dict[str, str]]:
+    """`entries`, ending early instead of raising if parsing fails midway; the failure
+    turns `result` into an error so its validators are not committed.
+    """
+    try:
+        yield from entries
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Failed to parse feed %s: %s", result["feed_url"], exc)
+        result["status"], result["error"] = "error", str(exc) or exc.__class__.__name__
+
+
+def _conditional_headers(validators: Dict[str, Optional[str]]) -> Dict[str, str]:
+    headers: Dict[str, str] = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def fetch_feed(
+    feed_url: str,
+    *,
+    timeout: float = 20.0,
+    host_slot: Optional[threading.BoundedSemaphore] = None,
+    validator_store: Optional[FeedValidatorStore] = None,
+    fast_parser: bool = True,
+) -> Dict[str, Any]:
+    """Fetch one feed, never raising. Returns a per-feed result dict:
+    {"feed_url", "status", "entries", "fetch_ms", "error", "validators"}.
+
+    "entries" is a one-shot iterator: the body is parsed and canonicalized as the
+    caller consumes it, so entries it drops (e.g. links already stored) are never
+    collected into a list. A parse failure midway sets status "error" once reached.
+
+    `timeout` bounds the whole fetch: waiting for `host_slot`, connecting, the first
+    byte and the transfer all share it.
+
+    status is "ok", "error", "not_modified" (HTTP 304) or "unchanged" (same body
+    hash as last time); the last two carry no entries. With a `validator_store`,
+    the request is conditional; the new validators are returned, not saved, so the
+    caller can commit them once the entries have been processed.
+    """
+    started = time.perf_counter()
+    # The deadline covers the wait for a host slot as well as the download
+    deadline = time.monotonic() + timeout
+    validators: Dict[str, Optional[str]] = {}
+    body = b""
+    error: Optional[str] = None
+    try:
+        previous = validator_store.get(feed_url) if validator_store is not None else {}
+        headers = _conditional_headers(previous)
+        if host_slot is not None:
+            if not host_slot.acquire(timeout=_remaining(deadline)):
+                raise TimeoutError(f"no free slot for {_feed_host(feed_url)} within {timeout:g}s")
+            try:
+                status_code, body, resp_headers = _download_feed(feed_url, deadline, headers)
+            finally:
+                host_slot.release()
+        else:
+            status_code, body, resp_headers = _download_feed(feed_url, deadline, headers)
+        if status_code == 304:
+            status = "not_modified"
+        else:
+            content_hash = hashlib.sha256(body).hexdigest()
+            validators = {
+                "etag": resp_headers.get("etag"),
+                "last_modified": resp_headers.get("last-modified"),
+                "content_hash": content_hash,
+            }
+            status = "unchanged" if previous.get("content_hash") == content_hash else "ok"
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Failed to fetch feed %s: %s", feed_url, exc)
+        status, error = "error", str(exc) or exc.__class__.__name__
+    result: Dict[str, Any] = {
+        "feed_url": feed_url,
+        "status": status,
+        "entries": (),
+        "fetch_ms": int((time.perf_counter() - started) * 1000),
+        "error": error,
+        "validators": validators,
+    }
+    if status == "ok":
+        result["entries"] = _guarded_entries(
+            result, _canonicalize_entries(iter_feed_entries(body, fast=fast_parser))
+        )
+    return result
+
+
+def commit_feed_validators(result: Dict[str, Any], validator_store: FeedValidatorStore) -> None:
+    """Persist the validators of a successfully processed `fetch_feed` result."""
+    validators = result.get("validators") or {}
+    if result.get("status") not in {"ok", "unchanged"} or not validators:
+        return
+    validator_store.update(
+        result["feed_url"],
+        etag=validators.get("etag"),
+        last_modified=validators.get("last_modified"),
+        content_hash=validators.get("content_hash"),
+    )
+
+
+def _interleave_by_host(feed_urls: Iterable[str]) -> List[str]:
+    """Order feeds round-robin across hosts so one outlet's feeds don't occupy every worker."""
+    by_host: Dict[str, List[str]] = {}
+    for url in dict.fromkeys(feed_urls):
+        by_host.setdefault(_feed_host(url), []).append(url)
+    ordered: List[str] = []
+    queues = list(by_host.values())
+    while queues:
+        for queue in queues:
+            ordered.append(queue.pop(0))
+        queues = [q for q in queues if q]
+    return ordered
+
+
+def fetch_feeds_concurrently(
+    feed_urls: Iterable[str],
+    *,
+    max_workers: int = 8,
+    timeout: float = 20.0,
+    per_host_limit: int = 2,
+    validator_store: Optional[FeedValidatorStore] = None,
+    fast_parser: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    """Fetch feeds on a thread pool and yield each `fetch_feed` result as soon as it completes.
+    Duplicate URLs are fetched once; at most `per_host_limit` downloads run per host.
+    """
+    ordered = _interleave_by_host(feed_urls)
+    if not ordered:
+        return
+    host_slots = {
+        host: threading.BoundedSemaphore(max(1, per_host_limit))
+        for host in {_feed_host(url) for url in ordered}
+    }
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="rss-fetch") as pool:
+        futures = [
+            pool.submit(
+                fetch_feed,
+                url,
+                timeout=timeout,
+                host_slot=host_slots[_feed_host(url)],
+                validator_store=validator_store,
+                fast_parser=fast_parser,
+            )
+            for url in ordered
+        ]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+import base64
+import re
+
+
+# Only params that are unambiguously click tracking; short generic names such as
+# `ref` or `oc` can select content on some sites and are kept
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid",
+    "cmpid", "ocid", "ref_src", "_ga",
+}
+TRACKING_PREFIXES = ("utm_", "__twitter", "itm_")
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+GOOGLE_NEWS_HOST = "news.google.com"
+_URL_IN_BYTES = re.compile(rb"https?://[\x21-\x7e]+")
+
+
+def canonicalize_url(url: Optional[str]) -> Optional[str]:
+    """Return a cleaned, still-fetchable form of `url`: lower-cased scheme and host,
+    default port, fragment and tracking params removed. Path and the order of the
+    remaining params are left as published.
+    """
+    if not url:
+        return url
+    try:
+        parts = urlparse(url.strip())
+    except Exception:  # noqa: BLE001
+        return url
+    if parts.scheme not in {"http", "https"} or not parts.netloc:
+        return url
+    scheme = parts.scheme.lower()
+    host = parts.netloc.lower()
+    if ":" in host and host.rsplit(":", 1)[1] == DEFAULT_PORTS.get(scheme):
+        host = host.rsplit(":", 1)[0]
+    params = parse_qsl(parts.query, keep_blank_values=True)
+    query = [
+        (k, v) for k, v in params
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    # Re-encode only when something was dropped, so untouched queries stay byte-identical
+    encoded = parts.query if len(query) == len(params) else urlencode(query)
+    return urlunparse((scheme, host, parts.path, parts.params, encoded, ""))
+
+
+def dedupe_key(url: Optional[str]) -> Optional[str]:
+    """Looser identity than `canonicalize_url` for within-run dedupe: ignores scheme,
+    `www.`/`m.`/`amp.` host prefixes and a trailing slash.
+    """
+    canonical = canonicalize_url(url)
+    if not canonical:
+        return canonical
+    parts = urlparse(canonical)
+    host = parts.netloc
+    for prefix in ("www.", "m.", "amp."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{host}{path}" + (f"?{query}" if query else "")
+
+
+def is_google_news_link(url: Optional[str]) -> bool:
+    return bool(url) and urlparse(url).netloc.lower() == GOOGLE_NEWS_HOST
+
+
+def _decode_google_news_id(url: str) -> Optional[str]:
+    """Older Google News article ids are base64 protobufs embedding the target URL."""
+    path = urlparse(url).path
+    marker = "/articles/"
+    if marker not in path:
+        return None
+    article_id = path.split(marker, 1)[1].split("/", 1)[0]
+    try:
+        raw = base64.urlsafe_b64decode(article_id + "=" * (-len(article_id) % 4))
+    except Exception:  # noqa: BLE001
+        return None
+    match = _URL_IN_BYTES.search(raw)
+    if not match:
+        return None
+    return match.group(0).decode("ascii", errors="ignore")
+
+
+def resolve_entry_link(url: Optional[str]) -> Optional[str]:
+    """Canonicalize `url`; news.google.com links whose article id decodes offline are
+    replaced by the publisher URL. Other Google News links are kept as they are (no
+    network lookups: newer ids do not decode and the redirect is done in JavaScript).
+    """
+    if not url:
+        return url
+    url = canonicalize_url(url)
+    if is_google_news_link(url):
+        decoded = _decode_google_news_id(url)
+        if decoded:
+            url = canonicalize_url(decoded)
+    return url
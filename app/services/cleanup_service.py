@@ -1,13 +1,16 @@
 from __future__ import annotations
 
 from typing import Dict, List, Optional
-from textwrap import shorten
 import logging
 
 from app.db.supabase_client import get_client, list_keywords
 from app.services.content_extractor import extract_main_text
-from app.llm.openrouter_client import get_openrouter_client
+from app.llm.cache import cached_call
+from app.llm.openrouter_client import get_llm_client
+from app.llm.prompt_builder import prepare_item
 from app.location.locations import MALAYSIA_DISTRICTS, normalize_location
+from app.utils.extractive_summary import extractive_summary
+from app.utils.keyword_match import choose_best_keyword
 from app.utils.media_name import infer_media_name_from_url
 
 
@@ -18,6 +21,8 @@ def _all_allowed_keywords() -> List[str]:
     return [k["keyword"] for k in list_keywords()]
 
 
+PROMPT_VERSION = "v1"
+
 SYSTEM_PROMPT = """
 You clean and standardize metadata for Malaysian public health monitoring.
 Given an article's URL, site text, and current fields, return a STRICT JSON object with keys:
@@ -33,8 +38,13 @@ Always produce exactly this JSON shape:
 
 
 def _build_user_prompt(url: str, text: str, allowed_keywords: List[str], current_media: Optional[str]) -> str:
+    from app.config import get_settings
+
     allowed = ", ".join(sorted(allowed_keywords)) or "(none provided)"
-    context = shorten(text, width=8000, placeholder=" ...") if text else ""
+    # Passages mentioning the allowed keywords or a location, within the token budget
+    _, context = prepare_item(
+        "cleanup", "", text or "", get_settings().llm_cleanup_token_budget, keywords=allowed_keywords
+    )
     return (
         f"URL: {url}\n\n"
         f"Allowed keywords: [{allowed}]\n\n"
@@ -48,17 +58,36 @@ def _llm_clean(url: str, text: str, allowed_keywords: List[str], current_media:
     from app.config import get_settings
 
     settings = get_settings()
-    client = get_openrouter_client()
+    content = {
+        "url": url,
+        "text": text,
+        "allowed_keywords": sorted(allowed_keywords),
+        "current_media": current_media,
+    }
+    return cached_call(
+        "cleanup",
+        PROMPT_VERSION,
+        settings.openrouter_model,
+        content,
+        lambda: _llm_clean_uncached(settings.openrouter_model, url, text, allowed_keywords, current_media),
+    )
+
+
+def _llm_clean_uncached(
+    model: str, url: str, text: str, allowed_keywords: List[str], current_media: Optional[str]
+) -> Optional[Dict]:
+    client = get_llm_client()
     prompt = _build_user_prompt(url, text, allowed_keywords, current_media)
-    completion = client.chat.completions.create(
-        model=settings.openrouter_model,
-        messages=[
+    content = client.complete(
+        [
             {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": prompt},
         ],
+        model=model,
         temperature=0.2,
     )
-    content = completion.choices[0].message.content.strip()
+    if not content:
+        return None
     cleaned = content.strip()
     if cleaned.startswith("```"):
         cleaned = cleaned.strip("` ")
@@ -73,15 +102,15 @@ def _llm_clean(url: str, text: str, allowed_keywords: List[str], current_media:
         return None
 
 
-def _fill_defaults(url: str, guess: Dict, allowed_keywords: List[str], text: str) -> Dict:
+def _fill_defaults(url: str, guess: Dict, allowed_keywords: List[str], text: str, title: str = "") -> Dict:
     # media_name fallback from URL
     if not guess.get("media_name"):
         guess["media_name"] = infer_media_name_from_url(url) or "Unknown"
 
-    # keyword must be from allowed list; choose first if not provided
+    # keyword must be from allowed list; otherwise pick the best match in the text
     kw = guess.get("keyword")
     if not kw or kw not in allowed_keywords:
-        guess["keyword"] = allowed_keywords[0] if allowed_keywords else "general"
+        guess["keyword"] = choose_best_keyword(text, allowed_keywords)
 
     # normalize location; if none provided, fallback to general 'Malaysia'
     state = guess.get("state")
@@ -101,23 +130,11 @@ def _fill_defaults(url: str, guess: Dict, allowed_keywords: List[str], text: str
             default_state = guess["state"]
             guess["district"] = (MALAYSIA_DISTRICTS[default_state][0]) if MALAYSIA_DISTRICTS.get(default_state) else None
 
-    # ensure summary exists (one sentence). If missing, make a short extractive sentence.
+    # ensure summary exists (one sentence). If missing, pick the best sentence locally.
     summary = (guess.get("summary") or "").strip()
     if not summary:
-        # naive first sentence extraction
-        snippet = (text or "").strip()
-        end_idx = -1
-        for sep in [". ", "! ", "? "]:
-            idx = snippet.find(sep)
-            if idx != -1:
-                end_idx = idx + 1
-                break
-        first_sentence = snippet[: end_idx if end_idx != -1 else 160].strip()
-        if first_sentence:
-            summary = first_sentence
-        else:
-            summary = "Summary unavailable."
-        guess["summary"] = summary
+        summary = extractive_summary(text, title=title, keywords=allowed_keywords)
+        guess["summary"] = summary or "Summary unavailable."
 
     return guess
 
@@ -127,6 +144,9 @@ def clean_mentions_with_llm(limit: int = 50) -> Dict[str, int]:
     call LLM once per row to fill media_name, ONE keyword (from allowed list), and location.
     Writes cleaned values back to DB. Returns counts.
     """
+    from app.config import get_settings
+
+    settings = get_settings()
     client = get_client()
     allowed_keywords = _all_allowed_keywords()
     # Select rows that need cleaning: missing media_name or empty keywords or null location or null summary
@@ -151,8 +171,13 @@ def clean_mentions_with_llm(limit: int = 50) -> Dict[str, int]:
         summary_empty = (row.get("summary") or "").strip() == ""
         if not (media_empty or keywords_empty or location_empty or summary_empty):
             continue
-        guess = _llm_clean(url or "", text, allowed_keywords, row.get("media_name")) or {}
-        guess = _fill_defaults(url or "", guess, allowed_keywords, text)
+        # Rows missing only a summary skip the LLM unless summary_policy is "llm"
+        summary_only = summary_empty and not (media_empty or keywords_empty or location_empty)
+        if summary_only and settings.summary_policy != "llm":
+            guess = {}
+        else:
+            guess = _llm_clean(url or "", text, allowed_keywords, row.get("media_name")) or {}
+        guess = _fill_defaults(url or "", guess, allowed_keywords, text, title=row.get("headline") or "")
 
         # Only update the fields that are empty
         update_payload: Dict[str, object] = {}
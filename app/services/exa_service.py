@@ -8,7 +8,7 @@ from datetime import datetime, timedelta, timezone
 from app.utils.keyword_match import choose_best_keyword
 from app.utils.media_name import infer_media_name_from_url
 from app.location.locations import normalize_location
-from app.llm.location_llm import extract_location_with_llm
+from app.llm.location_llm import resolve_locations
 
 
 def get_exa_client() -> Exa:
@@ -145,8 +145,13 @@ def enrich_with_exa_contents(records: List[Dict]) -> List[Dict]:
 
     allowed_keywords = [k["keyword"] for k in __import__("app.db.supabase_client", fromlist=["list_keywords"]).list_keywords()]  # lazy import to avoid cycle
 
+    # Gazetteer first for every record; only unresolved ones go to one batched LLM call
+    locations = resolve_locations(
+        [{"title": r.get("title") or "", "text": url_to_text.get(r.get("url"), "")} for r in records]
+    )
+
     enriched: List[Dict] = []
-    for r in records:
+    for r, loc in zip(records, locations):
         url = r.get("url")
         text = url_to_text.get(url, "")
         summary = url_to_summary.get(url) or r.get("title")
@@ -154,8 +159,6 @@ def enrich_with_exa_contents(records: List[Dict]) -> List[Dict]:
         best_kw = choose_best_keyword(" ".join([r.get("title") or "", text]), allowed_keywords)
         # media name
         media_name = infer_media_name_from_url(url) or r.get("source") or "Unknown"
-        # location via rules -> LLM fallback on text
-        loc = extract_location_with_llm(r.get("title") or "", text or "")
 
         enriched.append(
             {
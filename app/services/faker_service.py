@@ -5,7 +5,7 @@ from datetime import datetime, timezone
 import json
 import random
 
-from app.llm.openrouter_client import get_openrouter_client
+from app.llm.openrouter_client import get_llm_client
 from app.config import get_settings
 from app.utils.media_name import infer_media_name_from_url
 from app.location.locations import MALAYSIA_DISTRICTS, normalize_location
@@ -105,22 +105,17 @@ def _coerce_item(item: Dict, allowed_keywords: List[str]) -> Optional[Dict]:
 
 def generate_fake_mentions(count: int, allowed_keywords: List[str]) -> List[Dict]:
     settings = get_settings()
-    client = get_openrouter_client()
+    client = get_llm_client()
     prompt = _build_user_prompt(count, allowed_keywords)
     try:
-        completion = client.chat.completions.create(
-            model=settings.openrouter_model,
-            messages=[
+        content = client.complete(
+            [
                 {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt},
             ],
+            model=settings.openrouter_model,
             temperature=0.7,
         )
-        if not completion or not getattr(completion, "choices", None):
-            return []
-        first = completion.choices[0]
-        message = getattr(first, "message", None)
-        content = getattr(message, "content", None)
         if not content:
             return []
         raw = content.strip()
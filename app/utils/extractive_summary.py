@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from html import unescape
+from typing import Iterable, List
+import re
+
+from app.location.gazetteer import get_gazetteer
+from app.utils.keyword_matcher import fold_text, get_keyword_matcher
+
+
+_TAG = re.compile(r"<(script|style)\b.*?</\1>|<[^>]+>", re.IGNORECASE | re.DOTALL)
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"'”’)]*\s+(?=[\"'“‘(]?[A-Z0-9])")
+# Words ending in "." that do not end a sentence
+_ABBREVIATIONS = {"dr", "mr", "mrs", "ms", "prof", "no", "st", "dato", "datuk", "tan", "sri", "jan", "feb", "aug", "sept", "oct", "nov", "dec", "e.g", "i.e", "vs"}
+# Folded phrases that mark navigation / syndication boilerplate rather than content
+BOILERPLATE_MARKERS = (
+    "click here", "read more", "continue reading", "subscribe to", "subscribe now",
+    "all rights reserved", "follow us", "appeared first on",
+)
+# Only the lead of long articles is scored
+_MAX_CHARS = 4000
+_MAX_SENTENCES = 15
+MAX_WORDS = 30
+
+
+def strip_html(text: str) -> str:
+    """Plain text of an HTML fragment (tags, scripts and entities removed, whitespace collapsed)."""
+    if not text:
+        return ""
+    return " ".join(unescape(_TAG.sub(" ", text)).split())
+
+
+def split_sentences(text: str) -> List[str]:
+    sentences: List[str] = []
+    buffer = ""
+    for part in _SENTENCE_END.split(text):
+        buffer = f"{buffer} {part}".strip() if buffer else part.strip()
+        last_word = buffer.rsplit(" ", 1)[-1].rstrip(".").lower()
+        if last_word in _ABBREVIATIONS or (len(last_word) == 1 and last_word.isalpha()):
+            continue
+        if buffer:
+            sentences.append(buffer)
+        buffer = ""
+    if buffer:
+        sentences.append(buffer)
+    return sentences
+
+
+def _shorten(sentence: str, max_words: int) -> str:
+    words = sentence.split()
+    if len(words) <= max_words:
+        return sentence
+    return " ".join(words[:max_words]).rstrip(",;:") + "..."
+
+
+def extractive_summary(
+    text: str,
+    *,
+    title: str = "",
+    keywords: Iterable[str] = (),
+    max_words: int = MAX_WORDS,
+) -> str:
+    """One-sentence summary picked from `text` (HTML allowed) without an LLM.
+
+    Sentences in the lead are scored by keyword hits, a resolvable Malaysian location,
+    word overlap with the title and position; very short sentences and boilerplate are
+    penalized. Falls back to the title when the text has no usable sentence.
+    """
+    plain = strip_html(text)[:_MAX_CHARS]
+    sentences = split_sentences(plain)[:_MAX_SENTENCES]
+    if not sentences:
+        return _shorten(strip_html(title), max_words)
+    matcher = get_keyword_matcher(list(keywords))
+    gazetteer = get_gazetteer()
+    title_words = set(fold_text(title).split())
+    best, best_score = sentences[0], float("-inf")
+    for position, sentence in enumerate(sentences):
+        folded = fold_text(sentence)
+        words = folded.split()
+        score = 2.0 * len(matcher.counts(sentence))
+        if gazetteer.resolve(sentence):
+            score += 1.0
+        if title_words and words:
+            score += 2.0 * len(title_words.intersection(words)) / len(title_words)
+        score += 1.0 / (1 + position)
+        if len(words) < 6:
+            score -= 2.0
+        if any(marker in folded for marker in BOILERPLATE_MARKERS):
+            score -= 3.0
+        if score > best_score:
+            best, best_score = sentence, score
+    return _shorten(best, max_words)
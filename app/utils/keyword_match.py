@@ -2,14 +2,16 @@ from __future__ import annotations
 
 from typing import List
 
+from app.utils.keyword_matcher import get_keyword_matcher
+
 
 def choose_best_keyword(text: str, allowed_keywords: List[str]) -> str:
+    """Keyword with the most whole-word hits in `text` (ties keep list order);
+    the first allowed keyword when none match.
+    """
     if not allowed_keywords:
         return "general"
-    lowered = (text or "").lower()
-    for kw in allowed_keywords:
-        if kw and kw.lower() in lowered:
-            return kw
+    counts = get_keyword_matcher(allowed_keywords).counts(text or "")
+    if counts:
+        return max(counts, key=counts.__getitem__)
     return allowed_keywords[0]
-
-
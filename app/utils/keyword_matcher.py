@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Tuple
+import copy
+import re
+import threading
+import unicodedata
+
+
+_SEPARATORS = re.compile(r"[^\w]+|_+")
+
+
+def fold_text(text: str) -> str:
+    """Case-fold and normalize text for matching: NFKC, diacritics removed, every run of
+    punctuation/whitespace collapsed to one space (so "COVID-19" folds to "covid 19").
+    """
+    if not text:
+        return ""
+    if text.isascii():
+        # Nothing to normalize or strip; skips the per-character pass on most news text
+        stripped = text
+    else:
+        decomposed = unicodedata.normalize("NFKD", unicodedata.normalize("NFKC", text))
+        stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " " + _SEPARATORS.sub(" ", stripped.casefold()).strip() + " "
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over folded keywords, matching whole words only.
+
+    Text is scanned once regardless of how many keywords are compiled in. Keywords
+    that fold to the same form (e.g. "Denggi" and "denggi") are all reported.
+    """
+
+    def __init__(self, keywords: Iterable[str]) -> None:
+        self.keywords: List[str] = [k for k in dict.fromkeys(keywords) if k and fold_text(k).strip()]
+        self._order = {k: i for i, k in enumerate(self.keywords)}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, str]]] = [[]]
+        for keyword in self.keywords:
+            # Patterns carry their surrounding spaces, which enforces word boundaries
+            self._add(fold_text(keyword), keyword)
+        self._build_failure_links()
+
+    def _add(self, pattern: str, keyword: str) -> None:
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(pattern), keyword))
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                candidate = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = candidate if candidate != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_iter(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """Yield (start, end, keyword) for each whole-word hit, offsets into fold_text(text)."""
+        folded = fold_text(text)
+        node = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for idx, ch in enumerate(folded):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, keyword in out[node]:
+                # Offsets exclude the boundary spaces
+                yield idx - length + 2, idx, keyword
+
+    def counts(self, text: str) -> Dict[str, int]:
+        """Hit count per matched keyword, in keyword order."""
+        hits: Dict[str, int] = {}
+        for _, _, keyword in self.find_iter(text):
+            hits[keyword] = hits.get(keyword, 0) + 1
+        return {k: hits[k] for k in sorted(hits, key=self._order.__getitem__)}
+
+    def matches(self, text: str) -> List[str]:
+        """Matched keywords, in keyword order."""
+        return list(self.counts(text))
+
+    def with_order(self, keywords: Iterable[str]) -> "KeywordMatcher":
+        """This matcher (same keyword set, shared automaton) reporting in `keywords` order."""
+        view = copy.copy(self)
+        view.keywords = [k for k in dict.fromkeys(keywords) if k in self._order]
+        view._order = {k: i for i, k in enumerate(view.keywords)}
+        return view
+
+
+# Callers pass the same keywords in different orders or versions (active keywords,
+# the prompt builder's cached list, a cleanup allow-list), so a few sets are kept
+_CACHE_SIZE = 8
+_automata: "OrderedDict[FrozenSet[str], KeywordMatcher]" = OrderedDict()
+_views: "OrderedDict[Tuple[str, ...], KeywordMatcher]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _lru_put(cache: "OrderedDict", key: object, value: KeywordMatcher) -> None:
+    cache[key] = value
+    if len(cache) > _CACHE_SIZE:
+        cache.popitem(last=False)
+
+
+def get_keyword_matcher(keywords: Iterable[str]) -> KeywordMatcher:
+    """Return the compiled matcher for `keywords`, reporting in their order. The
+    automaton is built once per keyword set, whatever order callers list it in.
+    """
+    key = tuple(keywords)
+    with _cache_lock:
+        matcher = _views.get(key)
+        if matcher is not None:
+            _views.move_to_end(key)
+            return matcher
+        keyword_set = frozenset(key)
+        base = _automata.get(keyword_set)
+        if base is None:
+            base = KeywordMatcher(key)
+            _lru_put(_automata, keyword_set, base)
+        else:
+            _automata.move_to_end(keyword_set)
+            base = base.with_order(key)
+        _lru_put(_views, key, base)
+        return base
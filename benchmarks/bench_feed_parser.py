@@ -0,0 +1,98 @@
+"""Benchmark: streaming fast feed parser vs. feedparser.
+
+Parses each fixture with both parsers, checks that they yield the same entries
+(title, link, date, image) and reports entries per second and peak traced memory.
+By default the feeds in benchmarks/fixtures are used: Google News, The Star and
+Lowyat-style RSS, Bernama-style Atom, and a Malay Mail WordPress feed whose HTML
+entities make it malformed XML (exercising the feedparser fallback). Pass other
+recorded feeds (e.g. saved with `curl -o gn.xml <feed-url>`), or `--synthetic`
+for a generated 2000-item Google News-style feed.
+
+    uv run python -m benchmarks.bench_feed_parser [--synthetic] [feed.xml ...]
+"""
+from __future__ import annotations
+
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import feedparser
+
+from app.scrapers.rss_scraper import _entries_from_parsed, iter_feed_entries
+
+
+FIXTURES = Path(__file__).parent / "fixtures"
+# Fields both parsers must agree on; summaries differ by design (feedparser sanitizes HTML)
+_COMPARED = ("title", "link", "published_date", "image_url")
+
+
+def synthetic_feed(items: int = 2000) -> bytes:
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0" xmlns:media="http://search.yahoo.com/mrss/"><channel>'
+        "<title>Malaysia - Google News</title><link>https://news.google.com/</link>"
+    ]
+    for i in range(items):
+        parts.append(
+            "<item>"
+            f"<title>Kes denggi meningkat di Petaling Jaya, laporan {i} - The Star</title>"
+            f"<link>https://news.google.com/rss/articles/CBMi{i:08d}?oc=5</link>"
+            f'<guid isPermaLink="false">CBMi{i:08d}</guid>'
+            "<pubDate>Mon, 12 Oct 2026 10:00:00 GMT</pubDate>"
+            "<description>&lt;ol&gt;&lt;li&gt;&lt;a href=\"https://news.google.com/rss/articles/x\" "
+            "target=\"_blank\"&gt;Kes denggi meningkat di Petaling Jaya&lt;/a&gt;&amp;nbsp;&amp;nbsp;"
+            "&lt;font color=\"#6f6f6f\"&gt;The Star&lt;/font&gt;&lt;/li&gt;&lt;/ol&gt;</description>"
+            f'<media:content url="https://img.example.my/{i}.jpg" medium="image"/>'
+            "<source url=\"https://www.thestar.com.my\">The Star</source>"
+            "</item>"
+        )
+    parts.append("</channel></rss>")
+    return "".join(parts).encode("utf-8")
+
+
+def measure(label: str, parse: Callable[[bytes], List[dict]], body: bytes) -> None:
+    tracemalloc.start()
+    started = time.perf_counter()
+    entries = parse(body)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"  {label:<11} {len(entries):>6} entries  {elapsed * 1000:8.1f} ms  "
+        f"{len(entries) / elapsed:>10,.0f} entries/s  peak {peak / 1e6:7.2f} MB"
+    )
+
+
+def _fields(entries: List[dict]) -> List[Tuple[Optional[str], ...]]:
+    return [tuple(entry.get(key) for key in _COMPARED) for entry in entries]
+
+
+def check_equivalent(name: str, body: bytes) -> None:
+    expected = _fields(_entries_from_parsed(feedparser.parse(body)))
+    actual = _fields(list(iter_feed_entries(body, fast=True)))
+    assert expected, f"{name}: feedparser found no entries"
+    for i, (want, got) in enumerate(zip(expected, actual)):
+        assert want == got, f"{name}: entry {i} differs: feedparser {want} vs fast {got}"
+    assert len(expected) == len(actual), f"{name}: {len(expected)} vs {len(actual)} entries"
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    if "--synthetic" in args:
+        args.remove("--synthetic")
+        fixtures = [("synthetic (2000 items)", synthetic_feed())]
+    else:
+        fixtures = []
+    paths = [Path(arg) for arg in args] or ([] if fixtures else sorted(FIXTURES.glob("*.xml")))
+    fixtures += [(str(path), path.read_bytes()) for path in paths]
+    for name, body in fixtures:
+        check_equivalent(name, body)
+        print(f"{name}: {len(body) / 1e6:.2f} MB, same entries from both parsers")
+        measure("feedparser", lambda b: _entries_from_parsed(feedparser.parse(b)), body)
+        measure("fast", lambda b: list(iter_feed_entries(b, fast=True)), body)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Micro-benchmark: indexed normalize_location vs. the previous linear scans.
+
+Replays a cleanup-like workload (LLM-suggested state/district pairs in mixed case,
+district-only rows, unknown names) and reports calls per second.
+
+    uv run python -m benchmarks.bench_normalize_location [rows]
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+from typing import Optional, Tuple
+
+from app.location.locations import MALAYSIA_DISTRICTS, normalize_location
+
+
+def linear_normalize_location(state: Optional[str], district: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """The pre-index implementation, kept here for comparison."""
+    if not state and not district:
+        return None, None
+    normalized_state = None
+    for s in MALAYSIA_DISTRICTS.keys():
+        if state and s.lower() == state.lower():
+            normalized_state = s
+            break
+    if not normalized_state and state:
+        if state.lower() in {"penang", "pulau pinang"}:
+            normalized_state = "Pulau Pinang"
+    normalized_district = None
+    if normalized_state and district:
+        for d in MALAYSIA_DISTRICTS[normalized_state]:
+            if d.lower() == district.lower():
+                normalized_district = d
+                break
+    if not normalized_state and district:
+        candidates = [
+            s for s, ds in MALAYSIA_DISTRICTS.items() if any(d.lower() == district.lower() for d in ds)
+        ]
+        if len(candidates) == 1:
+            normalized_state = candidates[0]
+            for d in MALAYSIA_DISTRICTS[normalized_state]:
+                if d.lower() == district.lower():
+                    normalized_district = d
+                    break
+    return normalized_state, normalized_district
+
+
+def build_workload(rows: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    pairs = [(s, d) for s, ds in MALAYSIA_DISTRICTS.items() for d in ds]
+    workload = []
+    for _ in range(rows):
+        state, district = rng.choice(pairs)
+        kind = rng.random()
+        if kind < 0.5:
+            workload.append((state.upper(), district.lower()))
+        elif kind < 0.8:
+            workload.append((None, district))
+        elif kind < 0.9:
+            workload.append((state, None))
+        else:
+            workload.append(("Unknown", "Nowhere"))
+    return workload
+
+
+def bench(fn, workload) -> float:
+    started = time.perf_counter()
+    for state, district in workload:
+        fn(state, district)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    workload = build_workload(rows)
+    linear = bench(linear_normalize_location, workload)
+    indexed = bench(normalize_location, workload)
+    print(f"rows:    {rows}")
+    print(f"linear:  {linear:.3f}s  ({rows / linear:,.0f} calls/s)")
+    print(f"indexed: {indexed:.3f}s  ({rows / indexed:,.0f} calls/s)")
+    print(f"speedup: {linear / indexed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
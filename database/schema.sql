@@ -29,5 +29,42 @@ CREATE TABLE IF NOT EXISTS keywords (
 ALTER TABLE IF EXISTS mentions
 ADD COLUMN IF NOT EXISTS location JSONB;
 
+-- One row per link: bulk_upsert_mentions inserts with ON CONFLICT (link) DO NOTHING.
+-- Remove existing duplicate links first, e.g.
+--   DELETE FROM mentions a USING mentions b WHERE a.link = b.link AND a.ctid > b.ctid;
+DO $$
+BEGIN
+    IF to_regclass('public.mentions') IS NOT NULL THEN
+        CREATE UNIQUE INDEX IF NOT EXISTS mentions_link_key ON mentions (link);
+    END IF;
+END $$;
 
+-- Newest-first listing and keyset pagination of GET /health-mentions (ORDER BY date DESC, id DESC)
+DO $$
+BEGIN
+    IF to_regclass('public.mentions') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS mentions_date_id_idx ON mentions (date DESC, id DESC);
+    END IF;
+END $$;
 
+
+
+-- Feed registry: one row per RSS feed with polling health/yield statistics
+CREATE TABLE IF NOT EXISTS feeds (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    url TEXT UNIQUE NOT NULL,
+    enabled BOOLEAN NOT NULL DEFAULT TRUE,
+    poll_interval_minutes INT NOT NULL DEFAULT 30,
+    interval_override_minutes INT,
+    next_poll_at TIMESTAMP WITH TIME ZONE,
+    last_polled_at TIMESTAMP WITH TIME ZONE,
+    last_success_at TIMESTAMP WITH TIME ZONE,
+    last_status TEXT,
+    last_error TEXT,
+    error_streak INT NOT NULL DEFAULT 0,
+    avg_items_per_poll DOUBLE PRECISION NOT NULL DEFAULT 0,
+    health_yield DOUBLE PRECISION NOT NULL DEFAULT 0,
+    total_polls INT NOT NULL DEFAULT 0,
+    total_inserted INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);